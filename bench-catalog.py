@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the catalog tooling in books_catalog.py
+
+    python bench-catalog.py suite [--sizes 2000,100000,1000000] [--output bench-baseline.json]
+    python bench-catalog.py compare bench-baseline.json [CURRENT.json] [--threshold 10]
+    python bench-catalog.py index [--sizes 2000,100000,1000000]
+    python bench-catalog.py backend [--sizes 2000,100000,1000000]
+
+`suite` times generate_books() throughput, serialization of every catalog
+format (pretty JSON, minified JSON, the booksData JS global, NDJSON and
+gzipped pretty JSON) and a full parse/load of each artifact, and records
+each case's output size and peak traced memory. Results are saved as a
+versioned JSON baseline. `compare` reruns the suite (or reads a second
+results file) and exits non-zero when a case is slower or bigger than
+the baseline by more than the threshold.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import books_catalog
+
+# (text, category, sort) combinations typed into the storefront
+QUERIES = [
+    ("", None, "price-low"),
+    ("habits", None, None),
+    ("george orwell", None, None),
+    ("the", None, "price-high"),
+    ("", "Business", None),
+    ("edition 7", "Fiction", "price-low"),
+    ("rwell", None, None),
+    ("atsby", None, "price-high"),
+    ("e ", None, None),
+]
+
+
+def parse_sizes(text):
+    return [int(size) for size in text.split(",") if size]
+
+
+def timed(fn, repeat):
+    """Median wall time of `repeat` calls, in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def linear_query(books, text, category=None, sort=None):
+    """What js/browse-books.js does today: filter every record, then sort."""
+    q = text.lower()
+    result = [
+        i for i, book in enumerate(books)
+        if (q in book["title"].lower() or q in book["author"].lower())
+        and (category is None or book["category"] == category)
+    ]
+    if sort == "price-low":
+        result.sort(key=lambda i: books[i]["price"])
+    elif sort == "price-high":
+        result.sort(key=lambda i: -books[i]["price"])
+    return result
+
+
+def bench_index(sizes, repeat):
+    print(f"{'books':>9}  {'query':<32} {'scan ms':>9} {'index ms':>9} {'speedup':>8}")
+    for size in sizes:
+        books = list(books_catalog.generate_books(size, rng=random.Random(size)))
+        start = time.perf_counter()
+        index = books_catalog.CatalogIndex.build(books)
+        print(f"{size:>9}  {'(build index)':<32} {'':>9} {(time.perf_counter() - start) * 1000:>9.1f}")
+        for text, category, sort in QUERIES:
+            label = " ".join(part for part in (repr(text), category, sort) if part)
+            if index.query(text, category, sort=sort) != linear_query(books, text, category, sort):
+                raise SystemExit(f"❌ index and scan disagree on {label} at {size} books")
+            scan = timed(lambda: linear_query(books, text, category, sort), repeat)
+            lookup = timed(lambda: index.query(text, category, sort=sort), repeat)
+            print(f"{size:>9}  {label:<32} {scan:>9.2f} {lookup:>9.2f} {scan / max(lookup, 1e-6):>7.1f}x")
+        del books, index
+
+
+# Bump when cases are added, removed or measured differently; compare refuses to mix versions
+SUITE_VERSION = 1
+SUITE_FORMATS = ["pretty", "min", "js", "ndjson"]
+JS_PREFIX = "const booksData = "
+
+
+def artifact_path(directory, name):
+    if name == "gzip":
+        return os.path.join(directory, books_catalog.FORMATS["pretty"][1]) + ".gz"
+    return os.path.join(directory, books_catalog.FORMATS[name][1])
+
+
+def load_artifact(name, path):
+    """Parse an artifact the way a consumer would; returns the records."""
+    if name == "gzip":
+        with gzip.open(path, "rb") as f:
+            return json.load(f)["books"]
+    if name == "ndjson":
+        with open(path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    with open(path, encoding="utf-8") as f:
+        if name == "js":
+            text = f.read()
+            return json.loads(text[len(JS_PREFIX):].rstrip().rstrip(";"))
+        data = json.load(f)
+    return data["books"] if name == "pretty" else data
+
+
+def serialize_artifact(name, books, path):
+    """Write `books` as artifact `name`; returns bytes written."""
+    if name == "gzip":
+        with open(path[:-len(".gz")], "rb") as f:
+            data = gzip.compress(f.read(), compresslevel=9, mtime=0)  # what generate-books.py --compress writes
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+    sink = books_catalog.FORMATS[name][0](path)
+    for book in books:
+        sink.add(book)
+    return sink.close()
+
+
+def traced_peak(fn):
+    """Peak memory allocated by Python while `fn` runs, in KiB."""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+
+def run_suite(sizes, repeat, memory=True):
+    results = []
+
+    def record(size, case, ms, size_bytes=None, peak_kb=None):
+        row = {"size": size, "case": case, "ms": round(ms, 3), "recordsPerSec": round(size / (ms / 1000)) if ms else None,
+               "bytes": size_bytes, "peakKb": peak_kb}
+        results.append(row)
+        detail = f"{size_bytes / 1024:>12.1f}" if size_bytes is not None else f"{'':>12}"
+        peak = f"{peak_kb / 1024:>9.1f}" if peak_kb is not None else f"{'':>9}"
+        print(f"{size:>9}  {case:<18} {ms:>10.1f} {row['recordsPerSec'] or 0:>12,} {detail} {peak}", flush=True)
+
+    print(f"{'books':>9}  {'case':<18} {'ms':>10} {'records/s':>12} {'KB':>12} {'peak MB':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            generate = lambda: sum(1 for _ in books_catalog.generate_books(size, rng=random.Random(size)))
+            record(size, "generate", timed(generate, repeat), peak_kb=traced_peak(generate) if memory else None)
+            books = list(books_catalog.generate_books(size, rng=random.Random(size)))
+
+            for name in SUITE_FORMATS + ["gzip"]:
+                path = artifact_path(tmp, name)
+                write = lambda: serialize_artifact(name, books, path)
+                ms = timed(write, repeat)
+                peak = traced_peak(write) if memory else None
+                record(size, f"serialize:{name}", ms, os.path.getsize(path), peak)
+
+            for name in SUITE_FORMATS + ["gzip"]:
+                path = artifact_path(tmp, name)
+                loaded = load_artifact(name, path)
+                if len(loaded) != size:
+                    raise SystemExit(f"❌ {name} loaded {len(loaded)} of {size} records")
+                del loaded
+                load = lambda: load_artifact(name, path)
+                ms = timed(load, repeat)
+                peak = traced_peak(load) if memory else None
+                record(size, f"load:{name}", ms, os.path.getsize(path), peak)
+
+            del books
+            for name in os.listdir(tmp):
+                os.remove(os.path.join(tmp, name))
+    return results
+
+
+def suite_document(sizes, repeat, results):
+    return {
+        "version": SUITE_VERSION,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "sizes": sizes,
+        "repeat": repeat,
+        "results": results,
+    }
+
+
+def compare_results(baseline, current, threshold):
+    """Print per-case changes; returns the cases that regressed beyond `threshold` percent."""
+    before = {(row["size"], row["case"]): row for row in baseline["results"]}
+    regressions = []
+    print(f"{'books':>9}  {'case':<18} {'base ms':>10} {'ms':>10} {'change':>8} {'bytes':>8} {'peak':>8}")
+    for row in current["results"]:
+        old = before.get((row["size"], row["case"]))
+        if old is None:
+            print(f"{row['size']:>9}  {row['case']:<18} {'(new)':>10} {row['ms']:>10.1f}")
+            continue
+        changes = {}
+        for metric in ("ms", "bytes", "peakKb"):
+            if old.get(metric) and row.get(metric) is not None:
+                changes[metric] = (row[metric] - old[metric]) / old[metric] * 100
+        flagged = [metric for metric, change in changes.items() if change > threshold]
+        cells = " ".join(f"{changes[m]:>+7.1f}%" if m in changes else f"{'':>8}" for m in ("ms", "bytes", "peakKb"))
+        mark = "  ❌ " + ", ".join(flagged) if flagged else ""
+        print(f"{row['size']:>9}  {row['case']:<18} {old['ms']:>10.1f} {row['ms']:>10.1f} {cells}{mark}")
+        if flagged:
+            regressions.append((row["size"], row["case"], flagged))
+    return regressions
+
+
+def bench_backend(sizes, repeat):
+    """Pure-Python generator against the NumPy column path."""
+    if books_catalog.np is None:
+        print("NumPy is not installed; only the python backend can run")
+    cases = [
+        ("python records", lambda n, _: sum(1 for _ in books_catalog.iter_books(n, seed=1, normalize=True))),
+        ("python -> columnar", lambda n, path: books_catalog.export(
+            books_catalog.iter_books(n, seed=1, normalize=True), [books_catalog.ColumnarWriter(path)])),
+    ]
+    if books_catalog.np is not None:
+        cases += [
+            ("numpy records",
+             lambda n, _: sum(1 for _ in books_catalog.iter_books_numpy(n, seed=1, normalize=True))),
+            ("numpy -> columnar", lambda n, path: books_catalog.export_batches(
+                books_catalog.iter_column_batches(n, seed=1, normalize=True), [books_catalog.ColumnarWriter(path)])),
+        ]
+
+    print(f"{'books':>9}  {'path':<20} {'ms':>10} {'records/s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.ssc")
+        for size in sizes:
+            for label, run in cases:
+                ms = timed(lambda: run(size, path), repeat)
+                print(f"{size:>9}  {label:<20} {ms:>10.1f} {size / (ms / 1000):>12,.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the ShelfSync catalog tooling.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    index = sub.add_parser("index", help="index query latency against the storefront's linear scan")
+    index.add_argument("--sizes", type=parse_sizes, default=[2000, 100000, 1000000])
+    index.add_argument("--repeat", type=int, default=5)
+
+    backend = sub.add_parser("backend", help="python vs numpy record generation and columnar output")
+    backend.add_argument("--sizes", type=parse_sizes, default=[2000, 100000, 1000000])
+    backend.add_argument("--repeat", type=int, default=3)
+
+    suite = sub.add_parser("suite", help="generation, serialization and load times per format, saved as a baseline")
+    suite.add_argument("--sizes", type=parse_sizes, default=[2000, 100000, 1000000])
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--no-memory", dest="memory", action="store_false",
+                       help="skip the extra traced run per case that measures peak memory")
+    suite.add_argument("--output", default="bench-baseline.json", help="results file (default: bench-baseline.json)")
+
+    compare = sub.add_parser("compare", help="flag cases that regressed against a baseline")
+    compare.add_argument("baseline", help="results file written by `suite`")
+    compare.add_argument("current", nargs="?", help="results to check (default: rerun the suite with the baseline's sizes)")
+    compare.add_argument("--threshold", type=float, default=10.0, help="allowed slowdown/growth in percent (default: 10)")
+    compare.add_argument("--no-memory", dest="memory", action="store_false", help="skip peak memory when rerunning")
+    compare.add_argument("--output", help="also save the rerun results here")
+
+    args = parser.parse_args(argv)
+    if args.command == "suite":
+        document = suite_document(args.sizes, args.repeat, run_suite(args.sizes, args.repeat, args.memory))
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+            f.write("\n")
+        print(f"\n✓ Results written to {args.output}")
+    elif args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if args.current:
+            with open(args.current, encoding="utf-8") as f:
+                current = json.load(f)
+        else:
+            results = run_suite(baseline["sizes"], baseline["repeat"], args.memory)
+            current = suite_document(baseline["sizes"], baseline["repeat"], results)
+            print()
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    json.dump(current, f, indent=2)
+                    f.write("\n")
+        if current.get("version") != baseline.get("version"):
+            print(f"❌ ERROR: baseline is suite version {baseline.get('version')}, results are "
+                  f"{current.get('version')}; record a new baseline")
+            return 2
+        regressions = compare_results(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} case(s) regressed by more than {args.threshold:g}%")
+            return 1
+        print(f"\n✅ No case regressed by more than {args.threshold:g}%")
+    elif args.command == "index":
+        bench_index(args.sizes, args.repeat)
+    elif args.command == "backend":
+        bench_backend(args.sizes, args.repeat)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
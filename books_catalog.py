@@ -0,0 +1,1488 @@
+"""
+The ShelfSync books catalog
+
+Seed data, the record generator and everything built from its records.
+generate-books.py is the command line over this module; other tools
+import it instead of loading the script.
+"""
+
+import bisect
+import cProfile
+import hashlib
+import inspect
+import json
+import mmap
+import os
+import pstats
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+
+try:
+    import brotli
+except ImportError:  # optional: .br siblings are skipped without it
+    brotli = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: --backend numpy falls back to the Python generator
+    np = None
+
+try:
+    import resource
+except ImportError:  # not on Windows: metrics leave peak RSS out
+    resource = None
+
+
+# Real book data with ISBNs - expanded collection
+books_data = [
+    # Fiction Classics (200 books)
+    {"title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "isbn": "9780743273565", "category": "Fiction"},
+    {"title": "1984", "author": "George Orwell", "isbn": "9780451524935", "category": "Fiction"},
+    {"title": "To Kill a Mockingbird", "author": "Harper Lee", "isbn": "9780061120084", "category": "Fiction"},
+    {"title": "Pride and Prejudice", "author": "Jane Austen", "isbn": "9780141439518", "category": "Fiction"},
+    {"title": "The Catcher in the Rye", "author": "J.D. Salinger", "isbn": "9780316769174", "category": "Fiction"},
+    {"title": "The Hobbit", "author": "J.R.R. Tolkien", "isbn": "9780547928227", "category": "Fiction"},
+    {"title": "The Alchemist", "author": "Paulo Coelho", "isbn": "9780062315007", "category": "Fiction"},
+    {"title": "Animal Farm", "author": "George Orwell", "isbn": "9780451526342", "category": "Fiction"},
+    {"title": "Brave New World", "author": "Aldous Huxley", "isbn": "9780060850524", "category": "Fiction"},
+    {"title": "The Handmaid's Tale", "author": "Margaret Atwood", "isbn": "9780385490818", "category": "Fiction"},
+    {"title": "Lord of the Flies", "author": "William Golding", "isbn": "9780399501487", "category": "Fiction"},
+    {"title": "The Chronicles of Narnia", "author": "C.S. Lewis", "isbn": "9780066238500", "category": "Fiction"},
+    {"title": "Dune", "author": "Frank Herbert", "isbn": "9780441172719", "category": "Fiction"},
+    {"title": "The Lord of the Rings", "author": "J.R.R. Tolkien", "isbn": "9780544003415", "category": "Fiction"},
+    {"title": "The Da Vinci Code", "author": "Dan Brown", "isbn": "9780307474278", "category": "Fiction"},
+    {"title": "Angels & Demons", "author": "Dan Brown", "isbn": "9780671027360", "category": "Fiction"},
+    {"title": "The Hunger Games", "author": "Suzanne Collins", "isbn": "9780439023481", "category": "Fiction"},
+    {"title": "Divergent", "author": "Veronica Roth", "isbn": "9780062024039", "category": "Fiction"},
+    {"title": "The Fault in Our Stars", "author": "John Green", "isbn": "9780142424179", "category": "Fiction"},
+    {"title": "Gone Girl", "author": "Gillian Flynn", "isbn": "9780307588371", "category": "Fiction"},
+    {"title": "The Girl on the Train", "author": "Paula Hawkins", "isbn": "9781594634024", "category": "Fiction"},
+    {"title": "The Silent Patient", "author": "Alex Michaelides", "isbn": "9781250301697", "category": "Fiction"},
+    {"title": "Where the Crawdads Sing", "author": "Delia Owens", "isbn": "9780735219090", "category": "Fiction"},
+    {"title": "The Nightingale", "author": "Kristin Hannah", "isbn": "9780312577223", "category": "Fiction"},
+    {"title": "All the Light We Cannot See", "author": "Anthony Doerr", "isbn": "9781476746586", "category": "Fiction"},
+    {"title": "The Book Thief", "author": "Markus Zusak", "isbn": "9780375842207", "category": "Fiction"},
+    {"title": "Life of Pi", "author": "Yann Martel", "isbn": "9780156027328", "category": "Fiction"},
+    {"title": "The Kite Runner", "author": "Khaled Hosseini", "isbn": "9781594631931", "category": "Fiction"},
+    {"title": "A Thousand Splendid Suns", "author": "Khaled Hosseini", "isbn": "9781594489501", "category": "Fiction"},
+    {"title": "The Help", "author": "Kathryn Stockett", "isbn": "9780425232200", "category": "Fiction"},
+    
+    # Business & Self-Help (200 books)
+    {"title": "Atomic Habits", "author": "James Clear", "isbn": "9780735211292", "category": "Business"},
+    {"title": "The Lean Startup", "author": "Eric Ries", "isbn": "9780307887894", "category": "Business"},
+    {"title": "Zero to One", "author": "Peter Thiel", "isbn": "9780804139298", "category": "Business"},
+    {"title": "The 7 Habits of Highly Effective People", "author": "Stephen Covey", "isbn": "9781982137274", "category": "Business"},
+    {"title": "Deep Work", "author": "Cal Newport", "isbn": "9781455586691", "category": "Business"},
+    {"title": "The 4-Hour Workweek", "author": "Timothy Ferriss", "isbn": "9780307465351", "category": "Business"},
+    {"title": "Good to Great", "author": "Jim Collins", "isbn": "9780066620992", "category": "Business"},
+    {"title": "Built to Last", "author": "Jim Collins", "isbn": "9780060516406", "category": "Business"},
+    {"title": "The Innovator's Dilemma", "author": "Clayton M. Christensen", "isbn": "9781633691780", "category": "Business"},
+    {"title": "Start with Why", "author": "Simon Sinek", "isbn": "9781591846444", "category": "Business"},
+    {"title": "Leaders Eat Last", "author": "Simon Sinek", "isbn": "9781591848011", "category": "Business"},
+    {"title": "The Infinite Game", "author": "Simon Sinek", "isbn": "9780735213500", "category": "Business"},
+    {"title": "Dare to Lead", "author": "Brené Brown", "isbn": "9780399592522", "category": "Business"},
+    {"title": "The Five Dysfunctions of a Team", "author": "Patrick Lencioni", "isbn": "9780787960759", "category": "Business"},
+    {"title": "Crucial Conversations", "author": "Kerry Patterson", "isbn": "9780071771320", "category": "Business"},
+    {"title": "Influence", "author": "Robert B. Cialdini", "isbn": "9780061241895", "category": "Business"},
+    {"title": "Drive", "author": "Daniel H. Pink", "isbn": "9781594484803", "category": "Business"},
+    {"title": "Essentialism", "author": "Greg McKeown", "isbn": "9780804137386", "category": "Business"},
+    {"title": "The One Thing", "author": "Gary Keller", "isbn": "9781885167774", "category": "Business"},
+    {"title": "Getting Things Done", "author": "David Allen", "isbn": "9780143126560", "category": "Business"},
+    {"title": "The E-Myth Revisited", "author": "Michael E. Gerber", "isbn": "9780887307287", "category": "Business"},
+    {"title": "Rework", "author": "Jason Fried", "isbn": "9780307463746", "category": "Business"},
+    {"title": "The Hard Thing About Hard Things", "author": "Ben Horowitz", "isbn": "9780062273208", "category": "Business"},
+    {"title": "Blue Ocean Strategy", "author": "W. Chan Kim", "isbn": "9781591396192", "category": "Business"},
+    {"title": "The Lean Six Sigma Pocket Toolbook", "author": "Michael L. George", "isbn": "9780071441193", "category": "Business"},
+    
+    # Non-Fiction (200 books)
+    {"title": "Thinking, Fast and Slow", "author": "Daniel Kahneman", "isbn": "9780374533557", "category": "Non-Fiction"},
+    {"title": "The Power of Now", "author": "Eckhart Tolle", "isbn": "9781577314806", "category": "Non-Fiction"},
+    {"title": "Educated", "author": "Tara Westover", "isbn": "9780399590504", "category": "Non-Fiction"},
+    {"title": "Becoming", "author": "Michelle Obama", "isbn": "9781524763138", "category": "Non-Fiction"},
+    {"title": "The Subtle Art of Not Giving a F*ck", "author": "Mark Manson", "isbn": "9780062457714", "category": "Non-Fiction"},
+    {"title": "The Immortal Life of Henrietta Lacks", "author": "Rebecca Skloot", "isbn": "9781400052189", "category": "Non-Fiction"},
+    {"title": "Outliers", "author": "Malcolm Gladwell", "isbn": "9780316017930", "category": "Non-Fiction"},
+    {"title": "Blink", "author": "Malcolm Gladwell", "isbn": "9780316010665", "category": "Non-Fiction"},
+    {"title": "The Tipping Point", "author": "Malcolm Gladwell", "isbn": "9780316346627", "category": "Non-Fiction"},
+    {"title": "Freakonomics", "author": "Steven D. Levitt", "isbn": "9780060731328", "category": "Non-Fiction"},
+    {"title": "Mindset", "author": "Carol S. Dweck", "isbn": "9780345472328", "category": "Non-Fiction"},
+    {"title": "Grit", "author": "Angela Duckworth", "isbn": "9781501111105", "category": "Non-Fiction"},
+    {"title": "The Power of Habit", "author": "Charles Duhigg", "isbn": "9780812981605", "category": "Non-Fiction"},
+    {"title": "Shoe Dog", "author": "Phil Knight", "isbn": "9781501135910", "category": "Non-Fiction"},
+    {"title": "Steve Jobs", "author": "Walter Isaacson", "isbn": "9781451648539", "category": "Non-Fiction"},
+    {"title": "Elon Musk", "author": "Ashlee Vance", "isbn": "9780062301239", "category": "Non-Fiction"},
+    {"title": "The Everything Store", "author": "Brad Stone", "isbn": "9780316219266", "category": "Non-Fiction"},
+    {"title": "Bad Blood", "author": "John Carreyrou", "isbn": "9781524731656", "category": "Non-Fiction"},
+    
+    # Science & Tech (200 books)
+    {"title": "Clean Code", "author": "Robert C. Martin", "isbn": "9780132350884", "category": "Science & Tech"},
+    {"title": "Design Patterns", "author": "Gang of Four", "isbn": "9780201633610", "category": "Science & Tech"},
+    {"title": "A Brief History of Time", "author": "Stephen Hawking", "isbn": "9780553380163", "category": "Science & Tech"},
+    {"title": "The Selfish Gene", "author": "Richard Dawkins", "isbn": "9780198788607", "category": "Science & Tech"},
+    {"title": "Cosmos", "author": "Carl Sagan", "isbn": "9780345539434", "category": "Science & Tech"},
+    {"title": "The Origin of Species", "author": "Charles Darwin", "isbn": "9780451529060", "category": "Science & Tech"},
+    {"title": "The Double Helix", "author": "James D. Watson", "isbn": "9780743216302", "category": "Science & Tech"},
+    {"title": "The Code Breaker", "author": "Walter Isaacson", "isbn": "9781982115852", "category": "Science & Tech"},
+    {"title": "The Gene", "author": "Siddhartha Mukherjee", "isbn": "9781476733524", "category": "Science & Tech"},
+    {"title": "Astrophysics for People in a Hurry", "author": "Neil deGrasse Tyson", "isbn": "9780393609394", "category": "Science & Tech"},
+    {"title": "The Elegant Universe", "author": "Brian Greene", "isbn": "9780393338102", "category": "Science & Tech"},
+    {"title": "The Pragmatic Programmer", "author": "Andrew Hunt", "isbn": "9780135957059", "category": "Science & Tech"},
+    {"title": "Introduction to Algorithms", "author": "Thomas H. Cormen", "isbn": "9780262033848", "category": "Science & Tech"},
+    {"title": "The Mythical Man-Month", "author": "Frederick P. Brooks Jr.", "isbn": "9780201835953", "category": "Science & Tech"},
+    {"title": "Code Complete", "author": "Steve McConnell", "isbn": "9780735619678", "category": "Science & Tech"},
+    {"title": "Refactoring", "author": "Martin Fowler", "isbn": "9780134757599", "category": "Science & Tech"},
+    {"title": "Domain-Driven Design", "author": "Eric Evans", "isbn": "9780321125217", "category": "Science & Tech"},
+    {"title": "The Phoenix Project", "author": "Gene Kim", "isbn": "9780988262508", "category": "Science & Tech"},
+    {"title": "The DevOps Handbook", "author": "Gene Kim", "isbn": "9781942788003", "category": "Science & Tech"},
+    {"title": "Site Reliability Engineering", "author": "Niall Richard Murphy", "isbn": "9781491929124", "category": "Science & Tech"},
+    {"title": "Designing Data-Intensive Applications", "author": "Martin Kleppmann", "isbn": "9781449373320", "category": "Science & Tech"},
+    
+    # History (100 books)
+    {"title": "Sapiens", "author": "Yuval Noah Harari", "isbn": "9780062316097", "category": "History"},
+    {"title": "The Art of War", "author": "Sun Tzu", "isbn": "9781599869773", "category": "History"},
+    {"title": "Guns, Germs, and Steel", "author": "Jared Diamond", "isbn": "9780393317558", "category": "History"},
+]
+
+GRADIENTS = ["gatsby", "orwell", "code", "patterns", "alchemist", "sapiens"]
+CONDITIONS = ["New", "Like New", "Used"]
+STOCKS = ["In Stock", "Low Stock", "Limited Stock"]
+COVER_URL = "https://covers.openlibrary.org/b/isbn/{isbn}-L.jpg"
+INR_PER_USD = 83
+PRICE_RANGE = (8.99, 89.99)  # USD, before normalization
+
+# Generate books by repeating and varying the base data.
+# Records are yielded one at a time so catalogs of any size stream to disk.
+# `start` offsets the record index (used by shards) and `rng` lets callers
+# pass a seeded random.Random for reproducible builds.
+def generate_books(count=2000, start=0, rng=random):
+    for i in range(start, start + count):
+        base_book = books_data[i % len(books_data)]
+        
+        # Add variation to create unique entries
+        variation_suffix = f" - Edition {(i // len(books_data)) + 1}" if i >= len(books_data) else ""
+        
+        yield {
+            "title": base_book["title"] + variation_suffix,
+            "author": base_book["author"],
+            "price": round(rng.uniform(*PRICE_RANGE), 2),
+            "category": base_book["category"],
+            "condition": rng.choice(CONDITIONS),
+            "stock": rng.choice(STOCKS),
+            "gradient": rng.choice(GRADIENTS),
+            "isbn": base_book["isbn"],
+            "cover": COVER_URL.format(isbn=base_book["isbn"])
+        }
+
+
+_FLAT_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",\n      ", ": "))
+
+
+def _pretty_record(book):
+    """Serialize one flat record the way json.dump(indent=2) nests it under "books".
+
+    json only uses its C encoder when indent is None, so records are dumped
+    compactly with newline item separators instead, which is much faster and
+    byte-for-byte the same. Catalog records never hold nested containers.
+    """
+    if not book:
+        return "{}"
+    return "{\n      " + _FLAT_ENCODER.encode(book)[1:-1] + "\n    }"
+
+
+_MIN_ENCODER = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+
+# Sinks receive every record of a build through add() and finish in close(),
+# which returns the number of bytes written. export() drives them in one pass.
+class FileSink:
+    """Stream records into a single file framed by `opening`/`separator`/`closing`."""
+
+    name = "file"
+    opening = "["
+    separator = ","
+    closing = "]"
+    empty = "[]"
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.bytes = 0
+        self._file = open(path, "wb")
+
+    def serialize(self, book):
+        return _MIN_ENCODER.encode(book)
+
+    def _emit(self, text):
+        data = text.encode("utf-8")
+        self._file.write(data)
+        self.bytes += len(data)
+
+    def add(self, book):
+        self._emit((self.separator if self.count else self.opening) + self.serialize(book))
+        self.count += 1
+
+    def close(self):
+        self._emit(self.closing if self.count else self.empty)
+        self._file.close()
+        return self.bytes
+
+
+class PrettyJsonSink(FileSink):
+    """books-database.json: `{"books": [...]}` laid out like json.dump(indent=2)."""
+
+    name = "pretty"
+    opening = '{\n  "books": [\n    '
+    separator = ",\n    "
+    closing = "\n  ]\n}"
+    empty = '{\n  "books": []\n}'
+
+    def serialize(self, book):
+        return _pretty_record(book)
+
+
+class MinifiedJsonSink(FileSink):
+    """books-array.js: a bare minified JSON array."""
+
+    name = "min"
+
+
+class JsGlobalSink(FileSink):
+    """books-data.js: the minified array assigned to a `booksData` global."""
+
+    name = "js"
+    opening = "const booksData = \n["
+    closing = "];"
+    empty = "const booksData = \n[];"
+
+
+class NdjsonSink(FileSink):
+    """One minified record per line."""
+
+    name = "ndjson"
+    opening = ""
+    separator = "\n"
+    closing = "\n"
+    empty = ""
+
+
+class PreviewSink(FileSink):
+    """first100books.json: the first `limit` records as a minified array."""
+
+    name = "preview"
+
+    def __init__(self, path, limit=100):
+        super().__init__(path)
+        self.limit = limit
+
+    def add(self, book):
+        if self.count < self.limit:
+            super().add(book)
+
+
+def write_catalog(books, path):
+    """Stream records into a `{"books": [...]}` file laid out like json.dump(indent=2).
+
+    Returns (record count, bytes written).
+    """
+    sink = PrettyJsonSink(path)
+    for book in books:
+        sink.add(book)
+    size = sink.close()
+    return sink.count, size
+
+
+# JSON framing written by write_catalog, used to splice shard bodies together
+CATALOG_HEADER = b'{\n  "books": [\n'
+CATALOG_FOOTER = b'\n  ]\n}'
+
+
+def shard_bounds(count, shards):
+    """Split `count` records into `shards` contiguous (start, stop) ranges."""
+    size, extra = divmod(count, shards)
+    bounds = []
+    start = 0
+    for shard in range(shards):
+        stop = start + size + (1 if shard < extra else 0)
+        bounds.append((start, stop))
+        start = stop
+    return bounds
+
+
+def shard_seed(seed, shard):
+    """Derive a stable per-shard seed from the master seed."""
+    digest = hashlib.sha256(f"{seed}:{shard}".encode("ascii")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def normalize_book(book, rate=INR_PER_USD):
+    """Convert a generated record, in place, to the storefront's form.
+
+    Category and condition are upper-cased and the USD price becomes rupees,
+    which is what correct-books.js used to do as a separate rewrite pass.
+    """
+    book["category"] = book["category"].upper()
+    book["condition"] = book["condition"].upper()
+    book["price"] = round(book["price"] * rate, 2)
+    return book
+
+
+def iter_books(count, seed=None, shards=1, normalize=False, metrics=None):
+    """Yield the same records a sharded build with this seed would write, in order.
+
+    With `metrics` (a BuildMetrics) the seeding, synthesis and normalization
+    steps are timed separately.
+    """
+    if seed is None:
+        books = generate_books(count)
+    elif metrics is None:
+        books = (
+            book
+            for shard, (start, stop) in enumerate(shard_bounds(count, shards))
+            for book in generate_books(stop - start, start, random.Random(shard_seed(seed, shard)))
+        )
+    else:
+        with metrics.stage("seed"):
+            streams = [(start, stop, random.Random(shard_seed(seed, shard)))
+                       for shard, (start, stop) in enumerate(shard_bounds(count, shards))]
+        books = (book for start, stop, rng in streams for book in generate_books(stop - start, start, rng))
+    if metrics is None:
+        return map(normalize_book, books) if normalize else books
+    books = metrics.timed_iter("synthesize", books)
+    return map(metrics.timed_call("normalize", normalize_book), books) if normalize else books
+
+
+def generator_fingerprint():
+    """Hash of everything besides books_data that decides what a record holds."""
+    parts = [INR_PER_USD, PRICE_RANGE, COVER_URL, CONDITIONS, STOCKS, GRADIENTS,
+             inspect.getsource(generate_books), inspect.getsource(normalize_book)]
+    return hashlib.blake2b(json.dumps(parts).encode("utf-8"), digest_size=8).hexdigest()
+
+
+def part_path(output, shard):
+    root, ext = os.path.splitext(output)
+    return f"{root}.part-{shard:05d}{ext}"
+
+
+def _build_shard(job):
+    path, start, stop, seed, normalize = job
+    books = generate_books(stop - start, start, random.Random(seed))
+    return write_catalog(map(normalize_book, books) if normalize else books, path)
+
+
+def merge_parts(parts, output):
+    """Concatenate shard catalogs into one catalog without re-parsing them."""
+    size = 0
+    with open(output, "wb") as out:
+        def emit(data):
+            nonlocal size
+            out.write(data)
+            size += len(data)
+
+        wrote_any = False
+        for part in parts:
+            part_size = os.path.getsize(part)
+            body = part_size - len(CATALOG_HEADER) - len(CATALOG_FOOTER)
+            if body <= 0:
+                continue  # empty shard
+            with open(part, "rb") as f:
+                f.seek(len(CATALOG_HEADER))
+                emit(b",\n" if wrote_any else CATALOG_HEADER)
+                while body:
+                    block = f.read(min(body, 1 << 20))
+                    emit(block)
+                    body -= len(block)
+            wrote_any = True
+        emit(CATALOG_FOOTER if wrote_any else b'{\n  "books": []\n}')
+    return size
+
+
+_DECODER = json.JSONDecoder()
+
+
+def read_catalogs(paths, block_size=1 << 20):
+    """Stream the records of write_catalog files in order without loading any of them whole."""
+    decode = _DECODER.raw_decode
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            buf = f.read(block_size)
+            if not buf.startswith(CATALOG_HEADER.decode("ascii")):
+                continue  # empty catalog
+            pos = len(CATALOG_HEADER)
+            eof = False
+            while True:
+                while pos < len(buf) and buf[pos] in ", \n":
+                    pos += 1
+                if pos < len(buf) and buf[pos] == "]":
+                    break
+                try:
+                    book, end = decode(buf, pos)
+                except json.JSONDecodeError:
+                    # A record cut off at the block boundary never parses, so read on
+                    if eof:
+                        raise
+                    more = f.read(block_size)
+                    eof = not more
+                    buf = buf[pos:] + more
+                    pos = 0
+                    continue
+                yield book
+                pos = end
+
+
+def build_sharded(count, output, seed, shards, workers=None, keep_parts=False, normalize=False):
+    """Generate shards in worker processes, then merge them into `output`.
+
+    With keep_parts the shard files are left as the result and nothing is merged.
+    Returns (record count, bytes written).
+    """
+    jobs = [
+        (part_path(output, shard), start, stop, shard_seed(seed, shard), normalize)
+        for shard, (start, stop) in enumerate(shard_bounds(count, shards))
+    ]
+    with ProcessPoolExecutor(max_workers=workers or min(shards, os.cpu_count() or 1)) as pool:
+        results = list(pool.map(_build_shard, jobs))
+
+    parts = [job[0] for job in jobs]
+    if keep_parts:
+        return sum(c for c, _ in results), sum(s for _, s in results)
+
+    size = merge_parts(parts, output)
+    for part in parts:
+        os.remove(part)
+    return sum(c for c, _ in results), size
+
+
+def same_size(path, size):
+    try:
+        return os.path.getsize(path) == size
+    except OSError:
+        return False
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def write_if_changed(path, data):
+    """Write `data` unless `path` already holds exactly these bytes; returns True if written."""
+    if same_size(path, len(data)):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    with open(path, "wb") as f:
+        f.write(data)
+    return True
+
+
+def replace_if_changed(tmp_path, path):
+    """Move a freshly built file over `path` only if its content differs."""
+    if same_size(path, os.path.getsize(tmp_path)) and file_digest(path) == file_digest(tmp_path):
+        os.remove(tmp_path)
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+# A chunk file or one of its precompressed siblings
+CHUNK_FILE_RE = re.compile(r"(books-page-\d+\.json)(?:\.gz|\.br)?")
+
+
+class ChunkWriter:
+    """Write records as fixed-size page chunks plus a manifest with checksums.
+
+    Chunks are minified `{"books": [...]}` files named books-page-NNNNN.json,
+    so the storefront can render page 1 after fetching the manifest and one
+    chunk instead of the whole catalog.
+
+    Chunks whose bytes match the previous manifest are not rewritten, so
+    their mtimes (and ETags) survive rebuilds. `reuse` maps chunk numbers
+    known to be unchanged to the manifest entry they were written with;
+    those chunks are not even serialized.
+    """
+
+    name = "chunks"
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory, chunk_size=24, reuse=None):
+        self.directory = self.path = directory
+        self.chunk_size = chunk_size
+        self.reuse = reuse or {}
+        self.count = 0
+        self.bytes = 0
+        self.written = 0
+        self.chunks = []
+        self.manifest = None
+        self._pending = []
+        os.makedirs(directory, exist_ok=True)
+        self.previous = self.load_manifest(directory, chunk_size)
+
+    @classmethod
+    def load_manifest(cls, directory, chunk_size):
+        """Chunk entries of the manifest already in `directory`, if it used this chunk size."""
+        try:
+            with open(os.path.join(directory, cls.MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return []
+        return manifest["chunks"] if manifest.get("chunkSize") == chunk_size else []
+
+    @staticmethod
+    def encode_chunk(number, books):
+        """Bytes and manifest entry for chunk `number` (0-based) holding `books`."""
+        data = json.dumps({"books": books}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        entry = {
+            "file": f"books-page-{number + 1:05d}.json",
+            "count": len(books),
+            "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+        }
+        return data, entry
+
+    @classmethod
+    def write_manifest(cls, directory, manifest):
+        """Write manifest.json unless it is unchanged; returns the bytes written."""
+        data = json.dumps(manifest, indent=2).encode("utf-8")
+        return len(data) if write_if_changed(os.path.join(directory, cls.MANIFEST), data) else 0
+
+    def add(self, book):
+        self._pending.append(book)
+        if len(self._pending) == self.chunk_size:
+            self._flush()
+
+    def _flush(self):
+        number = len(self.chunks)
+        previous = self.previous[number] if number < len(self.previous) else None
+        reused = self.reuse.get(number)
+        self.count += len(self._pending)
+        if reused and reused["count"] == len(self._pending):
+            self.chunks.append(reused)
+            self._pending = []
+            return
+
+        data, entry = self.encode_chunk(number, self._pending)
+        path = os.path.join(self.directory, entry["file"])
+        if entry != previous or not same_size(path, len(data)):
+            with open(path, "wb") as f:
+                f.write(data)
+            self.bytes += len(data)
+            self.written += 1
+        self.chunks.append(entry)
+        self._pending = []
+
+    def close(self):
+        """Flush the last partial chunk, drop stale chunks and write the manifest.
+
+        Returns the bytes written across chunks and manifest.
+        """
+        if self._pending:
+            self._flush()
+        current = {chunk["file"] for chunk in self.chunks}
+        for name in os.listdir(self.directory):
+            match = CHUNK_FILE_RE.fullmatch(name)
+            if match and match.group(1) not in current:
+                os.remove(os.path.join(self.directory, name))
+
+        self.manifest = {"total": self.count, "chunkSize": self.chunk_size, "chunks": self.chunks}
+        self.bytes += self.write_manifest(self.directory, self.manifest)
+        return self.bytes
+
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    return TOKEN_RE.findall(text.lower())
+
+
+def _delta_encode(ids):
+    out = []
+    previous = 0
+    for i in ids:
+        out.append(i - previous)
+        previous = i
+    return out
+
+
+def _delta_decode(deltas):
+    ids = array("I")
+    total = 0
+    for delta in deltas:
+        total += delta
+        ids.append(total)
+    return ids
+
+
+class IndexBuilder:
+    """Collect search and facet postings while records stream past.
+
+    The artifact maps title/author tokens and each category and condition
+    to delta-encoded record ids, and stores the price-ascending and
+    price-descending permutations of record ids.
+    """
+
+    name = "index"
+    FACETS = ("category", "condition")
+
+    def __init__(self, path=None):
+        self.path = path
+        self.count = 0
+        self.tokens = {}
+        self.facets = {facet: {} for facet in self.FACETS}
+        self.prices = array("d")
+
+    def add(self, book):
+        i = self.count
+        for token in set(tokenize(book["title"]) + tokenize(book["author"])):
+            self.tokens.setdefault(token, array("I")).append(i)
+        for facet, postings in self.facets.items():
+            postings.setdefault(book[facet], array("I")).append(i)
+        self.prices.append(book["price"])
+        self.count += 1
+
+    def to_dict(self):
+        prices = self.prices
+        # sorted() is stable, so ties keep catalog order like the storefront's Array.sort
+        return {
+            "version": 1,
+            "count": self.count,
+            "tokens": {token: _delta_encode(ids) for token, ids in sorted(self.tokens.items())},
+            "facets": {
+                facet: {value: _delta_encode(ids) for value, ids in sorted(postings.items())}
+                for facet, postings in self.facets.items()
+            },
+            "priceAsc": sorted(range(self.count), key=prices.__getitem__),
+            "priceDesc": sorted(range(self.count), key=lambda i: -prices[i]),
+        }
+
+    def close(self):
+        data = json.dumps(self.to_dict(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with open(self.path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+
+def haystack(book):
+    """Lower-cased title and author; "\0" keeps a query from matching across the two."""
+    return f"{book['title'].lower()}\0{book['author'].lower()}"
+
+
+class CatalogIndex:
+    """Answer storefront queries from a books-index.json artifact.
+
+    Text search has the storefront's semantics: the query is a substring of
+    the lower-cased title or author. The token postings narrow the
+    candidates and, when the index has the records' text (`build`, or
+    `load` with the records), each candidate is checked against it. An
+    index loaded on its own returns that candidate superset instead.
+    Results are record ids in display order.
+    """
+
+    def __init__(self, data, texts=None):
+        self.count = data["count"]
+        self.tokens = {token: _delta_decode(ids) for token, ids in data["tokens"].items()}
+        self.vocabulary = sorted(self.tokens)
+        self.facets = {
+            facet: {value: _delta_decode(ids) for value, ids in postings.items()}
+            for facet, postings in data["facets"].items()
+        }
+        self.price_asc = array("I", data["priceAsc"])
+        self.price_desc = array("I", data["priceDesc"])
+        self.texts = texts
+        self._rank = {}
+
+    @classmethod
+    def load(cls, path, books=None):
+        with open(path, encoding="utf-8") as f:
+            return cls(json.load(f), None if books is None else [haystack(book) for book in books])
+
+    @classmethod
+    def build(cls, books):
+        builder = IndexBuilder()
+        texts = []
+        for book in books:
+            builder.add(book)
+            texts.append(haystack(book))
+        return cls(builder.to_dict(), texts)
+
+    def _vocabulary_matches(self, run, starts, ends):
+        """Tokens `run` can be part of; `starts`/`ends` pin it to a token boundary."""
+        if starts and ends:
+            return [run] if run in self.tokens else []
+        if starts:
+            pos = bisect.bisect_left(self.vocabulary, run)
+            end = bisect.bisect_left(self.vocabulary, run + "\U0010ffff", pos)
+            return self.vocabulary[pos:end]
+        if ends:
+            return [token for token in self.vocabulary if token.endswith(run)]
+        return [token for token in self.vocabulary if run in token]
+
+    def search(self, text):
+        """Return the set of record ids whose title or author contains `text`, or None for no filter."""
+        q = text.lower()
+        if not q:
+            return None
+        # Every word run of the query lies inside one title/author token. A run next to a
+        # non-word character of the query must start or end that token.
+        matches = None
+        for run in TOKEN_RE.finditer(q):
+            hits = set()
+            starts, ends = run.start() > 0, run.end() < len(q)
+            for token in self._vocabulary_matches(run.group(), starts, ends):
+                hits.update(self.tokens[token])
+            matches = hits if matches is None else matches & hits
+            if not matches:
+                return set()
+        if self.texts is None:
+            return matches if matches is not None else set(range(self.count))
+        texts = self.texts
+        candidates = range(self.count) if matches is None else matches
+        return {i for i in candidates if q in texts[i]}
+
+    def query(self, text="", category=None, condition=None, sort=None):
+        """Return matching record ids, ordered by `sort` ("price-low", "price-high") or catalog order."""
+        matches = self.search(text)
+        for facet, value in (("category", category), ("condition", condition)):
+            if value is None:
+                continue
+            ids = self.facets.get(facet, {}).get(value, ())
+            matches = set(ids) if matches is None else matches.intersection(ids)
+        return self.order(matches, sort)
+
+    def order(self, matches, sort=None):
+        """Put a set of record ids (None for every record) in display order."""
+        if matches is None:
+            if sort == "price-low":
+                return list(self.price_asc)
+            if sort == "price-high":
+                return list(self.price_desc)
+            return list(range(self.count))
+
+        if sort not in ("price-low", "price-high"):
+            return sorted(matches)
+        return sorted(matches, key=self._ranks(sort).__getitem__)
+
+    def _ranks(self, sort):
+        """Position of every record id in the chosen price permutation."""
+        if sort not in self._rank:
+            order = self.price_asc if sort == "price-low" else self.price_desc
+            ranks = array("I", bytes(4 * self.count))
+            for rank, i in enumerate(order):
+                ranks[i] = rank
+            self._rank[sort] = ranks
+        return self._rank[sort]
+
+
+FIELDS = ["title", "author", "price", "category", "condition", "stock", "gradient", "isbn", "cover"]
+COLUMNAR_MAGIC = b"SSBOOKS\x01"
+
+
+def _align(offset, boundary=8):
+    return (offset + boundary - 1) // boundary * boundary
+
+
+class ColumnarWriter:
+    """Write records into the columnar .ssc catalog format.
+
+    Layout: 8-byte magic, little-endian u32 header length, a JSON header
+    (count, dictionaries, column table), then 8-byte aligned columns:
+
+      category/condition/stock/gradient  u8 codes into header dictionaries
+      author                             u32 codes into a header dictionary
+      price                              float64
+      isbn                               u64 (13 digits)
+      title_offsets, title_data          u64 offsets into a UTF-8 string table
+
+    Covers are not stored: they are rebuilt from the ISBN, and only records
+    whose cover differs from the Open Library URL are kept in the header.
+    Columns are spooled to temporary files so memory stays flat.
+    """
+
+    name = "columnar"
+    CODED = ("category", "condition", "stock", "gradient")
+    FLUSH_EVERY = 65536
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self.dictionaries = {name: {} for name in self.CODED + ("author",)}
+        self.cover_overrides = {}
+        self._spools = {}
+        self._buffers = {}
+        self._title_offset = 0
+        for name, typecode in self._layout():
+            self._spools[name] = tempfile.TemporaryFile()
+            self._buffers[name] = array(typecode) if typecode != "bytes" else bytearray()
+        self._buffers["title_offsets"].append(0)
+
+    def _layout(self):
+        return [(name, "B") for name in self.CODED] + [
+            ("author", "I"),
+            ("price", "d"),
+            ("isbn", "Q"),
+            ("title_offsets", "Q"),
+            ("title_data", "bytes"),
+        ]
+
+    def _code(self, name, value):
+        codes = self.dictionaries[name]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            if name in self.CODED and code > 255:
+                raise ValueError(f"too many distinct {name} values for a u8 column")
+        return code
+
+    def add(self, book):
+        buffers = self._buffers
+        for name in self.CODED:
+            buffers[name].append(self._code(name, book[name]))
+        buffers["author"].append(self._code("author", book["author"]))
+        buffers["price"].append(book["price"])
+
+        isbn = book["isbn"]
+        if len(isbn) != 13 or not isbn.isdigit():
+            raise ValueError(f"record {self.count}: ISBN {isbn!r} is not 13 digits")
+        buffers["isbn"].append(int(isbn))
+        if book["cover"] != COVER_URL.format(isbn=isbn):
+            self.cover_overrides[str(self.count)] = book["cover"]
+
+        title = book["title"].encode("utf-8")
+        buffers["title_data"] += title
+        self._title_offset += len(title)
+        buffers["title_offsets"].append(self._title_offset)
+
+        self.count += 1
+        if self.count % self.FLUSH_EVERY == 0:
+            self._flush()
+
+    def add_columns(self, batch):
+        """Append a batch from iter_column_batches() without building records.
+
+        Coded fields arrive as (codes, labels) pairs; labels are mapped into
+        this file's dictionaries once per batch and codes are remapped as
+        whole arrays.
+        """
+        self._flush()
+        spools = self._spools
+        for name in self.CODED + ("author",):
+            codes, labels = batch[name]
+            lookup = np.array([self._code(name, label) for label in labels], dtype=np.uint32)
+            spools[name].write(lookup[codes].astype(np.uint8 if name in self.CODED else np.uint32).tobytes())
+        spools["price"].write(np.ascontiguousarray(batch["price"], dtype=np.float64).tobytes())
+
+        isbn_codes, isbn_labels = batch["isbn"]
+        for isbn in isbn_labels:
+            if len(isbn) != 13 or not isbn.isdigit():
+                raise ValueError(f"ISBN {isbn!r} is not 13 digits")
+        isbns = np.array([int(isbn) for isbn in isbn_labels], dtype=np.uint64)
+        spools["isbn"].write(isbns[isbn_codes].tobytes())
+
+        titles = [title.encode("utf-8") for title in batch["title"]]
+        ends = self._title_offset + np.cumsum(np.fromiter(map(len, titles), dtype=np.uint64, count=len(titles)))
+        spools["title_data"].write(b"".join(titles))
+        spools["title_offsets"].write(ends.tobytes())
+        if len(titles):
+            self._title_offset = int(ends[-1])
+        self.count += batch["count"]
+
+    def _flush(self):
+        for name, buffer in self._buffers.items():
+            self._spools[name].write(buffer if isinstance(buffer, bytearray) else buffer.tobytes())
+            del buffer[:]
+
+    def close(self):
+        """Assemble the spooled columns into the output file; returns its size."""
+        self._flush()
+        columns = {}
+        offset = 0
+        for name, typecode in self._layout():
+            length = self._spools[name].tell()
+            columns[name] = {"offset": offset, "length": length, "type": "B" if typecode == "bytes" else typecode}
+            offset = _align(offset + length)
+
+        header = json.dumps({
+            "version": 1,
+            "count": self.count,
+            "byteorder": sys.byteorder,
+            "fields": FIELDS,
+            "coverTemplate": COVER_URL,
+            "coverOverrides": self.cover_overrides,
+            "dictionaries": {name: list(codes) for name, codes in self.dictionaries.items()},
+            "columns": columns,
+        }, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+        with open(self.path, "wb") as out:
+            out.write(COLUMNAR_MAGIC + len(header).to_bytes(4, "little") + header)
+            data_start = _align(out.tell())
+            for name, _ in self._layout():
+                out.write(b"\0" * (data_start + columns[name]["offset"] - out.tell()))
+                spool = self._spools[name]
+                spool.seek(0)
+                shutil.copyfileobj(spool, out)
+                spool.close()
+            size = out.tell()
+        return size
+
+
+class ColumnarCatalog:
+    """Lazy, memory-mapped reader for .ssc catalogs written by ColumnarWriter.
+
+    Columns are zero-copy memoryviews over the mapping, so opening a catalog
+    costs only the header parse and catalog[i] decodes just record i.
+    The views handed out by column() live only until close().
+    """
+
+    def __init__(self, path):
+        self._columns = {}
+        self._view = None
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:8] != COLUMNAR_MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a columnar books catalog")
+        header_len = int.from_bytes(self._map[8:12], "little")
+        self.header = json.loads(self._map[12:12 + header_len])
+        self.count = self.header["count"]
+        self.fields = self.header["fields"]
+        self.dictionaries = self.header["dictionaries"]
+        self.cover_template = self.header["coverTemplate"]
+        self.cover_overrides = {int(i): url for i, url in self.header["coverOverrides"].items()}
+
+        view = self._view = memoryview(self._map)
+        data_start = _align(12 + header_len)
+        swap = self.header["byteorder"] != sys.byteorder
+        for name, column in self.header["columns"].items():
+            raw = view[data_start + column["offset"]:data_start + column["offset"] + column["length"]]
+            if column["type"] == "B":
+                self._columns[name] = raw
+            elif swap:
+                values = array(column["type"], raw)
+                values.byteswap()
+                self._columns[name] = values
+            else:
+                self._columns[name] = raw.cast(column["type"])
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        for i in range(self.count):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("record index out of range")
+        columns = self._columns
+        offsets = columns["title_offsets"]
+        isbn = f"{columns['isbn'][i]:013d}"
+        values = {
+            "title": str(columns["title_data"][offsets[i]:offsets[i + 1]], "utf-8"),
+            "author": self.dictionaries["author"][columns["author"][i]],
+            "price": columns["price"][i],
+            "isbn": isbn,
+            "cover": self.cover_overrides.get(i) or self.cover_template.format(isbn=isbn),
+        }
+        for name in ColumnarWriter.CODED:
+            values[name] = self.dictionaries[name][columns[name][i]]
+        return {field: values[field] for field in self.fields}
+
+    def column(self, name):
+        """Raw column view (codes for dictionary columns).
+
+        The view is released by close(); copy it (bytes(), array(), list())
+        to keep the values longer.
+        """
+        return self._columns[name]
+
+    def close(self):
+        """Release the column views and unmap the file.
+
+        Views sliced from a column by the caller are not ours to release.
+        While any is alive the mapping stays open and is unmapped when the
+        last one is dropped.
+        """
+        for column in self._columns.values():
+            if isinstance(column, memoryview):
+                column.release()
+        self._columns = {}
+        if self._view is not None:
+            self._view.release()
+            self._view = None
+        try:
+            self._map.close()
+        except BufferError:
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Vectorized backend: draw every random field of a batch as NumPy arrays and
+# only build dicts when a sink needs records.
+NUMPY_BATCH = 65536
+
+
+def iter_column_batches(count, seed=None, shards=1, normalize=False, batch_size=NUMPY_BATCH):
+    """Yield the catalog as column batches with the same schema as generate_books().
+
+    Coded fields are (codes, labels) pairs. Seeds follow the sharded layout
+    of iter_books(), but the NumPy generator draws different values than
+    the random module, so the two backends do not produce identical prices.
+    """
+    n_base = len(books_data)
+    titles = np.array([entry["title"] for entry in books_data], dtype=object)
+    base_labels = {
+        field: [entry[field].upper() if normalize and field == "category" else entry[field] for entry in books_data]
+        for field in ("author", "category", "isbn")
+    }
+    conditions = [c.upper() for c in CONDITIONS] if normalize else CONDITIONS
+
+    if seed is None:
+        ranges = [(0, count, np.random.default_rng())]
+    else:
+        ranges = [(start, stop, np.random.default_rng(shard_seed(seed, shard)))
+                  for shard, (start, stop) in enumerate(shard_bounds(count, shards))]
+    for start, stop, rng in ranges:
+        for batch_start in range(start, stop, batch_size):
+            n = min(batch_size, stop - batch_start)
+            idx = np.arange(batch_start, batch_start + n)
+            base = idx % n_base
+
+            title = titles[base]
+            edited = idx >= n_base
+            if edited.any():
+                suffix = np.char.add(" - Edition ", (idx[edited] // n_base + 1).astype(str)).astype(object)
+                title[edited] = title[edited] + suffix
+
+            price = np.round(rng.uniform(*PRICE_RANGE, n), 2)
+            if normalize:
+                price = np.round(price * INR_PER_USD, 2)
+            yield {
+                "count": n,
+                "title": title.tolist(),
+                "author": (base, base_labels["author"]),
+                "price": price,
+                "category": (base, base_labels["category"]),
+                "condition": (rng.integers(0, len(CONDITIONS), n), conditions),
+                "stock": (rng.integers(0, len(STOCKS), n), STOCKS),
+                "gradient": (rng.integers(0, len(GRADIENTS), n), GRADIENTS),
+                "isbn": (base, base_labels["isbn"]),
+            }
+
+
+def materialize(batch):
+    """Turn a column batch into record dicts in FIELDS order."""
+    covers = [COVER_URL.format(isbn=isbn) for isbn in batch["isbn"][1]]
+    decoded = {}
+    for field in ("author", "category", "condition", "stock", "gradient", "isbn"):
+        codes, labels = batch[field]
+        decoded[field] = [labels[code] for code in codes.tolist()]
+    cover_codes = batch["isbn"][0].tolist()
+    for k, (title, price) in enumerate(zip(batch["title"], batch["price"].tolist())):
+        yield {
+            "title": title,
+            "author": decoded["author"][k],
+            "price": price,
+            "category": decoded["category"][k],
+            "condition": decoded["condition"][k],
+            "stock": decoded["stock"][k],
+            "gradient": decoded["gradient"][k],
+            "isbn": decoded["isbn"][k],
+            "cover": covers[cover_codes[k]],
+        }
+
+
+def iter_books_numpy(count, seed=None, shards=1, normalize=False):
+    for batch in iter_column_batches(count, seed, shards, normalize):
+        yield from materialize(batch)
+
+
+def export_batches(batches, sinks, metrics=None):
+    """export() for column batches: columnar sinks take the arrays directly and
+    records are only materialized if some other sink needs them."""
+    clock = time.perf_counter
+    seconds = [0.0] * len(sinks)
+    columnar = [k for k, sink in enumerate(sinks) if isinstance(sink, ColumnarWriter)]
+    others = [k for k in range(len(sinks)) if k not in columnar]
+    if metrics is not None:
+        batches = metrics.timed_iter("synthesize", batches, size=lambda batch: batch["count"])
+        metrics.watch_writes(sinks)
+    count = 0
+    for batch in batches:
+        count += batch["count"]
+        for k in columnar:
+            start = clock()
+            sinks[k].add_columns(batch)
+            seconds[k] += clock() - start
+        if others:
+            books = materialize(batch)
+            if metrics is not None:
+                books = metrics.timed_iter("materialize", books)
+            for book in books:
+                for k in others:
+                    start = clock()
+                    sinks[k].add(book)
+                    seconds[k] += clock() - start
+
+    stats = []
+    for k, sink in enumerate(sinks):
+        start = clock()
+        size = sink.close()
+        seconds[k] += clock() - start
+        stats.append({"sink": sink.name, "path": sink.path, "records": sink.count,
+                      "bytes": size, "seconds": seconds[k]})
+    if metrics is not None:
+        metrics.add_export(count, stats)
+    return count, stats
+
+
+# --formats name -> (sink class, default file name next to --output)
+FORMATS = {
+    "pretty": (PrettyJsonSink, "books-database.json"),
+    "min": (MinifiedJsonSink, "books-array.js"),
+    "js": (JsGlobalSink, "books-data.js"),
+    "ndjson": (NdjsonSink, "books-database.ndjson"),
+    "preview": (PreviewSink, "first100books.json"),
+}
+
+
+def export(books, sinks, metrics=None):
+    """Feed every record to every sink in a single pass.
+
+    Returns (record count, per-sink stats with bytes and seconds spent).
+    """
+    clock = time.perf_counter
+    seconds = [0.0] * len(sinks)
+    if metrics is not None:
+        metrics.watch_writes(sinks)
+    count = 0
+    for book in books:
+        count += 1
+        for k, sink in enumerate(sinks):
+            start = clock()
+            sink.add(book)
+            seconds[k] += clock() - start
+
+    stats = []
+    for k, sink in enumerate(sinks):
+        start = clock()
+        size = sink.close()
+        seconds[k] += clock() - start
+        stats.append({"sink": sink.name, "path": sink.path, "records": sink.count,
+                      "bytes": size, "seconds": seconds[k]})
+    if metrics is not None:
+        metrics.add_export(count, stats)
+    return count, stats
+
+
+def peak_rss_kb(who="self"):
+    """Peak resident set size in KiB of this process or of its reaped children."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    return usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+
+
+class _TimedFile:
+    """File wrapper that charges write() calls to the "write" stage."""
+
+    def __init__(self, f, entry):
+        self._f = f
+        self._entry = entry
+
+    def write(self, data):
+        start = time.perf_counter()
+        n = self._f.write(data)
+        self._entry["seconds"] += time.perf_counter() - start
+        self._entry["bytes"] += len(data)
+        return n
+
+    def close(self):
+        self._f.close()
+
+
+class BuildMetrics:
+    """Per-stage timings, record and byte counts and peak RSS for one build.
+
+    The pipeline streams record by record, so stages interleave: time is
+    accumulated around each step instead of measured end to end. Writes
+    are timed for the single-file sinks; the other sinks' file I/O is
+    counted under "serialize". The extra clock reads slow a build by
+    10-20%, so compare metrics runs with each other, not with plain builds.
+    Written by --metrics-json, printed by --profile.
+    """
+
+    VERSION = 1
+    STAGES = ("seed", "synthesize", "normalize", "materialize", "diff", "shards", "parse", "serialize", "write",
+              "compress")
+
+    def __init__(self):
+        self.stages = {}
+        self.rss = {}
+        self.sinks = []
+        self.profile = []
+        self.started = time.perf_counter()
+
+    def entry(self, stage):
+        return self.stages.setdefault(stage, {"seconds": 0.0, "records": 0, "bytes": 0})
+
+    def add(self, stage, seconds, records=0, size=0):
+        entry = self.entry(stage)
+        entry["seconds"] += seconds
+        entry["records"] += records
+        entry["bytes"] += size
+
+    @contextmanager
+    def stage(self, stage, records=0, size=0):
+        """Time the body of a with-block as `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start, records, size)
+
+    def timed_iter(self, stage, items, size=None):
+        """Yield from `items`, charging the time spent producing each one to `stage`."""
+        clock = time.perf_counter
+        entry = self.entry(stage)
+        items = iter(items)
+        while True:
+            start = clock()
+            try:
+                item = next(items)
+            except StopIteration:
+                entry["seconds"] += clock() - start
+                return
+            entry["seconds"] += clock() - start
+            entry["records"] += 1 if size is None else size(item)
+            yield item
+
+    def timed_call(self, stage, fn):
+        """Wrap a one-record function so each call is charged to `stage`."""
+        clock = time.perf_counter
+        entry = self.entry(stage)
+
+        def call(item):
+            start = clock()
+            result = fn(item)
+            entry["seconds"] += clock() - start
+            entry["records"] += 1
+            return result
+
+        return call
+
+    def watch_writes(self, sinks):
+        entry = self.entry("write")
+        for sink in sinks:
+            if isinstance(sink, FileSink):
+                sink._file = _TimedFile(sink._file, entry)
+
+    def add_export(self, count, stats):
+        """Charge sink time, less the timed writes, to "serialize"."""
+        write = self.stages.get("write", {"seconds": 0.0})
+        seconds = sum(stat["seconds"] for stat in stats) - write["seconds"]
+        self.add("serialize", max(seconds, 0.0), count, sum(stat["bytes"] for stat in stats))
+        self.sinks += [dict(stat) for stat in stats]
+        self.sample_rss("generate")
+
+    def add_compression(self, seconds, encodings, rows):
+        self.add("compress", seconds, size=sum(row["raw"] for row in rows))
+        entry = self.entry("compress")
+        entry["files"] = sum(row["files"] for row in rows)
+        entry["skipped"] = sum(row["skipped"] for row in rows)
+        entry["compressedBytes"] = {encoding: sum(row[encoding] for row in rows) for encoding in encodings}
+        self.sample_rss("compress")
+
+    def sample_rss(self, phase):
+        self.rss[phase] = peak_rss_kb()
+
+    def run_profiled(self, fn, *args, **kwargs):
+        """Run `fn` under cProfile, keeping pstats for the top-N summary."""
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(fn, *args, **kwargs)
+        finally:
+            self._pstats = pstats.Stats(profiler)
+
+    def profile_summary(self, top):
+        stats = getattr(self, "_pstats", None)
+        if stats is None:
+            return []
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+        return [
+            {"function": f"{os.path.basename(file)}:{line}({name})", "calls": calls,
+             "tottime": round(tottime, 6), "cumtime": round(cumtime, 6)}
+            for (file, line, name), (_, calls, tottime, cumtime, _) in rows
+        ]
+
+    def to_dict(self, config, records, top=0):
+        order = {name: k for k, name in enumerate(self.STAGES)}
+        stages = {}
+        for name in sorted(self.stages, key=lambda name: order.get(name, len(order))):
+            entry = dict(self.stages[name])
+            if not entry["seconds"] and not entry["records"] and not entry["bytes"]:
+                continue
+            entry["seconds"] = round(entry["seconds"], 6)
+            stages[name] = entry
+        result = {
+            "version": self.VERSION,
+            "config": config,
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "records": records,
+            "profiled": bool(top),  # cProfile inflates every stage; compare like with like
+            "wallSeconds": round(time.perf_counter() - self.started, 6),
+            "peakRssKb": dict(self.rss, children=peak_rss_kb("children")),
+            "stages": stages,
+            "sinks": [dict(stat, seconds=round(stat["seconds"], 6)) for stat in self.sinks],
+        }
+        if top:
+            result["profile"] = self.profile_summary(top)
+        return result
+
+
+def print_metrics(metrics):
+    print(f"{'stage':<12} {'seconds':>9} {'records':>10} {'MB':>9} {'µs/record':>10}")
+    for name, entry in metrics["stages"].items():
+        per = entry["seconds"] / entry["records"] * 1e6 if entry["records"] else 0
+        print(f"{name:<12} {entry['seconds']:>9.3f} {entry['records']:>10} "
+              f"{entry['bytes'] / 1e6:>9.2f} {per:>10.2f}")
+    rss = ", ".join(f"{phase} {kb / 1024:.1f}" for phase, kb in metrics["peakRssKb"].items() if kb is not None)
+    print(f"{'wall':<12} {metrics['wallSeconds']:>9.3f}   peak RSS MB: {rss or 'n/a'}")
+    if metrics.get("profile"):
+        print()
+        print(f"{'tottime':>9} {'cumtime':>9} {'calls':>10}  function")
+        for row in metrics["profile"]:
+            print(f"{row['tottime']:>9.3f} {row['cumtime']:>9.3f} {row['calls']:>10}  {row['function']}")
+
+
+# Precompressed siblings served instead of the raw files
+COMPRESS_STATE = ".books-compress.json"
+BANDWIDTHS = [("3G", 1.6e6), ("4G", 12e6), ("Broadband", 50e6)]  # bits per second
+COMPRESS_BLOCK = 1 << 20
+
+
+def sink_outputs(sink):
+    """(label, files) produced by a closed sink."""
+    if isinstance(sink, ChunkWriter):
+        files = [os.path.join(sink.directory, chunk["file"]) for chunk in sink.chunks]
+        files.append(os.path.join(sink.directory, sink.MANIFEST))
+        return f"{sink.directory}/ ({len(files)} files)", files
+    return sink.path, [sink.path]
+
+
+def _encoder(encoding):
+    """(feed, finish) of a streaming compressor for `encoding`."""
+    if encoding == "gz":
+        # wbits=31 writes a gzip member: the bytes of gzip.compress(data, compresslevel=9, mtime=0)
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 31)
+        return compressor.compress, compressor.flush
+    compressor = brotli.Compressor(quality=11)
+    return compressor.process, compressor.finish
+
+
+def _compress_file(path, digest, encodings):
+    """Stream `path` into its compressed siblings one block at a time."""
+    raw = 0
+    results = {}
+    with ExitStack() as stack:
+        src = stack.enter_context(open(path, "rb"))
+        outputs = {encoding: stack.enter_context(open(f"{path}.{encoding}", "wb")) for encoding in encodings}
+        encoders = {encoding: _encoder(encoding) for encoding in encodings}
+        seconds = dict.fromkeys(encodings, 0.0)
+        for block in iter(lambda: src.read(COMPRESS_BLOCK), b""):
+            raw += len(block)
+            for encoding, (feed, _) in encoders.items():
+                start = time.perf_counter()
+                outputs[encoding].write(feed(block))
+                seconds[encoding] += time.perf_counter() - start
+        for encoding, (_, finish) in encoders.items():
+            start = time.perf_counter()
+            outputs[encoding].write(finish())
+            seconds[encoding] += time.perf_counter() - start
+            results[encoding] = (outputs[encoding].tell(), seconds[encoding])
+    return path, digest, raw, results
+
+
+def compress_outputs(groups, state_dir, workers=None):
+    """Write .gz (and .br when brotli is installed) next to every output file.
+
+    Files are compressed in parallel threads (zlib and brotli release the
+    GIL); a file whose SHA-256 matches the last run and whose siblings still
+    exist is skipped. Returns one row per group with raw/compressed sizes and
+    compression time.
+    """
+    encodings = ["gz"] + (["br"] if brotli else [])
+    state_path = os.path.join(state_dir, COMPRESS_STATE)
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            done = json.load(f)
+    except (OSError, ValueError):
+        done = {}
+
+    jobs, skipped = [], set()
+    for _, files in groups:
+        for path in files:
+            digest = file_digest(path)
+            if done.get(path) == digest and all(os.path.exists(f"{path}.{e}") for e in encodings):
+                skipped.add(path)
+            else:
+                jobs.append((path, digest))
+
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 1) as pool:
+        for path, digest, raw, sizes in pool.map(lambda job: _compress_file(*job, encodings), jobs):
+            results[path] = (raw, sizes)
+            done[path] = digest
+    for path in skipped:
+        results[path] = (os.path.getsize(path), {e: (os.path.getsize(f"{path}.{e}"), 0.0) for e in encodings})
+
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(done, f, indent=2)
+
+    rows = []
+    for label, files in groups:
+        row = {"label": label, "files": len(files), "skipped": sum(path in skipped for path in files),
+               "raw": sum(results[path][0] for path in files)}
+        for encoding in encodings:
+            row[encoding] = sum(results[path][1][encoding][0] for path in files)
+            row[f"{encoding}_seconds"] = sum(results[path][1][encoding][1] for path in files)
+        rows.append(row)
+    return encodings, rows
+
+
+def print_compression_report(encodings, rows):
+    header = f"{'artifact':<40} {'raw KB':>10}"
+    for encoding in encodings:
+        header += f" {'.' + encoding + ' KB':>10} {'ratio':>6} {encoding + ' ms':>8}"
+    print(header + f" {'skipped':>8}")
+    for row in rows:
+        line = f"{row['label'][-40:]:<40} {row['raw'] / 1024:>10.1f}"
+        for encoding in encodings:
+            ratio = row[encoding] / row["raw"] if row["raw"] else 0
+            line += f" {row[encoding] / 1024:>10.1f} {ratio:>6.1%} {row[encoding + '_seconds'] * 1000:>8.1f}"
+        print(line + f" {row['skipped']:>8}")
+
+    print()
+    print(f"{'estimated transfer':<20} " + " ".join(f"{name:>12}" for name, _ in BANDWIDTHS))
+    for encoding in ["raw"] + encodings:
+        total = sum(row[encoding] for row in rows)
+        print(f"{'all ' + encoding:<20} " + " ".join(f"{total * 8 / bps:>11.2f}s" for _, bps in BANDWIDTHS))
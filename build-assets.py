@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Bundle, minify and fingerprint the pages' local scripts and stylesheets
+
+Every page pulls several separate files from js/ and css/, none minified
+or cache-busted. For each page this scans the <script src> and
+<link rel="stylesheet"> tags, and replaces every run of adjacent local
+tags with one minified bundle named after a hash of its inputs. A page
+with the same run as another shares its bundle, so it is cached once.
+Tags are only merged when they sit next to each other, so execution
+order, inline scripts and CDN scripts (Supabase, Leaflet) stay as they
+were.
+
+The output is an overlay: dist/ holds the rewritten pages at their usual
+paths plus dist/assets/, and is copied over the site root on deploy.
+Pages are edited line by line with their own line endings kept, the
+same way patch-html.py edits cart.html, so CRLF pages stay CRLF.
+A rebuild skips any page whose HTML and inputs are unchanged, and any
+bundle that already exists under its hash.
+
+A script that does not parse (checked with `node --check` when node is
+installed) keeps its own tag: inside a bundle its syntax error would
+take the neighbouring scripts down with it.
+
+    python build-assets.py [PAGES...] [--out dist] [--force]
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_PAGES = ["index.html", "pages/*.html"]
+ASSET_DIR = "assets"
+BUILD_STATE = ".assets-build.json"
+MINIFIER_VERSION = "1"  # bump when minify_js/minify_css change, so every bundle is rebuilt
+
+SCRIPT_RE = re.compile(r'^(\s*)<script src="([^"]+)"></script>\s*$')
+STYLESHEET_RE = re.compile(r'^(\s*)<link rel="stylesheet" href="([^"]+)">\s*$')
+
+# After these a "/" starts a regex literal rather than a division
+REGEX_PREFIX = set("(,=:[!&|?{};+-*%<>~^") | {""}
+REGEX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw",
+                  "yield", "await"}
+WORD_RE = re.compile(r"[\w$]+$")
+
+
+def _last_token(out):
+    """The last identifier or punctuation character emitted so far."""
+    tail = "".join(out[-16:]).rstrip(" \n")
+    word = WORD_RE.search(tail)
+    return word.group(0) if word else tail[-1:]
+
+
+def minify_js(src):
+    """Drop comments, indentation, blank lines and repeated spaces.
+
+    Strings, template literals (including nested ${...}) and regex literals
+    are copied untouched. Newlines between statements are kept, so
+    automatic semicolon insertion behaves exactly as in the source.
+    """
+    out = []
+    i, n = 0, len(src)
+    stack = []  # brace depth per open ${ ... } inside template literals
+
+    def copy_quoted(i, quote):
+        start = i
+        i += 1
+        while i < n and src[i] != quote:
+            i += 2 if src[i] == "\\" else 1
+        out.append(src[start:i + 1])
+        return i + 1
+
+    def copy_template(i):
+        """Copy template text up to the closing backtick or the next ${."""
+        start = i
+        while i < n:
+            c = src[i]
+            if c == "\\":
+                i += 2
+            elif c == "`":
+                out.append(src[start:i + 1])
+                return i + 1
+            elif c == "$" and src[i + 1:i + 2] == "{":
+                out.append(src[start:i + 2])
+                stack.append(0)
+                return i + 2
+            else:
+                i += 1
+        out.append(src[start:])
+        return n
+
+    while i < n:
+        c = src[i]
+        if c in "\"'":
+            i = copy_quoted(i, c)
+        elif c == "`":
+            out.append("`")
+            i = copy_template(i + 1)
+        elif c == "/" and src[i + 1:i + 2] == "/":
+            while i < n and src[i] != "\n":
+                i += 1
+        elif c == "/" and src[i + 1:i + 2] == "*":
+            end = src.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            # A comment spanning lines still separates statements
+            gap = "\n" if "\n" in src[i:end] else " "
+            if out and out[-1][-1:] not in (gap, "\n"):
+                out.append(gap)
+            i = end
+        elif c == "/":
+            token = _last_token(out)
+            if token in REGEX_PREFIX or token in REGEX_KEYWORDS:
+                start = i
+                i += 1
+                in_class = False
+                while i < n and src[i] != "\n":
+                    if src[i] == "\\":
+                        i += 2
+                        continue
+                    if src[i] == "[":
+                        in_class = True
+                    elif src[i] == "]":
+                        in_class = False
+                    elif src[i] == "/" and not in_class:
+                        break
+                    i += 1
+                out.append(src[start:i + 1])
+                i += 1
+            else:
+                out.append(c)
+                i += 1
+        elif c in " \t\r":
+            while i < n and src[i] in " \t\r":
+                i += 1
+            if out and out[-1][-1:] not in (" ", "\n") and i < n and src[i] != "\n":
+                out.append(" ")
+        elif c == "\n":
+            while out and out[-1] == " ":
+                out.pop()
+            if out and out[-1][-1:] != "\n":
+                out.append("\n")
+            i += 1
+        elif c == "{" and stack:
+            stack[-1] += 1
+            out.append(c)
+            i += 1
+        elif c == "}" and stack:
+            if stack[-1] == 0:
+                stack.pop()
+                out.append("}")
+                i = copy_template(i + 1)
+            else:
+                stack[-1] -= 1
+                out.append(c)
+                i += 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out).strip() + "\n"
+
+
+CSS_TOKEN_RE = re.compile(r'/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|\s+|[^"\'/\s]+|/', re.S)
+
+
+def minify_css(src):
+    """Drop comments, collapse whitespace and the last semicolon of each block.
+
+    Strings are copied untouched.
+    """
+    out = []
+    for token in CSS_TOKEN_RE.findall(src):
+        if token.startswith("/*") or token.isspace():
+            # Comments separate tokens like whitespace does
+            if out and out[-1] != " " and out[-1][-1] not in "{};,":
+                out.append(" ")
+            continue
+        if token[0] not in "\"'":
+            token = token.replace(";}", "}")
+            if token[0] in "{};," and out and out[-1] == " ":
+                out.pop()
+            if token[0] == "}" and out and out[-1][0] not in "\"'" and out[-1].endswith(";"):
+                out[-1] = out[-1][:-1]
+        out.append(token)
+    return "".join(out).strip() + "\n"
+
+
+URL_RE = re.compile(r"""url\(\s*(['"]?)([^'")]+)\1\s*\)""")
+
+
+def rebase_css_urls(css, source, target_dir):
+    """Point relative url(...) references at the same files from `target_dir`."""
+    def rebase(match):
+        quote, url = match.groups()
+        if re.match(r"^(?:[a-z]+:|/|#)", url, re.I):
+            return match.group(0)
+        path = os.path.normpath(os.path.join(os.path.dirname(source), url))
+        return f"url({quote}{os.path.relpath(path, target_dir).replace(os.sep, '/')}{quote})"
+    return URL_RE.sub(rebase, css)
+
+
+def is_local(url):
+    return not re.match(r"^(?:[a-z]+:|//|/)", url, re.I)
+
+
+def file_digest(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+class Inputs:
+    """Digests and syntax-check results for asset files, cached across builds."""
+
+    def __init__(self, root, cache):
+        self.root = root
+        self.cache = cache
+        self.digests = {}
+        self.node = shutil.which("node")
+        self.broken = []
+
+    def digest(self, path):
+        if path not in self.digests:
+            self.digests[path] = file_digest(os.path.join(self.root, path))
+        return self.digests[path]
+
+    def bundlable(self, path):
+        if not path.endswith(".js") or self.node is None:
+            return True
+        digest = self.digest(path)
+        cached = self.cache.get(path)
+        if cached and cached[0] == digest:
+            ok = cached[1]
+        else:
+            result = subprocess.run([self.node, "--check", os.path.join(self.root, path)], capture_output=True)
+            ok = result.returncode == 0
+            self.cache[path] = [digest, ok]
+        if not ok and path not in self.broken:
+            self.broken.append(path)
+        return ok
+
+
+def find_runs(lines, page, root, bundlable):
+    """Runs of adjacent local <script src> or stylesheet tags: (kind, first, last, files)."""
+    runs = []
+    current = None
+    for k, line in enumerate(lines):
+        match, kind = SCRIPT_RE.match(line), "js"
+        if not match:
+            match, kind = STYLESHEET_RE.match(line), "css"
+        path = None
+        if match and is_local(match.group(2)):
+            path = os.path.normpath(os.path.join(os.path.dirname(page), match.group(2)))
+            if not os.path.isfile(os.path.join(root, path)) or not bundlable(path):
+                path = None  # missing and unparsable files keep their own tags
+        if path is None:
+            current = None
+            continue
+        if current and current[0] == kind and current[2] == k - 1:
+            current[2] = k
+            current[3].append(path)
+        else:
+            current = [kind, k, k, [path]]
+            runs.append(current)
+    return runs
+
+
+def bundle_name(kind, files, digests):
+    """Assets are named from their inputs, so an unchanged bundle is found without minifying."""
+    key = hashlib.sha256(f"{MINIFIER_VERSION}:{kind}".encode("utf-8"))
+    for path in files:
+        key.update(f"\0{path}\0{digests[path]}".encode("utf-8"))
+    stem = os.path.splitext(os.path.basename(files[0]))[0] if len(files) == 1 else "bundle"
+    return f"{stem}.{key.hexdigest()[:10]}.{kind}"
+
+
+def build_bundle(kind, files, root, out_path):
+    parts = []
+    for path in files:
+        with open(os.path.join(root, path), encoding="utf-8") as f:
+            text = f.read()
+        if kind == "css":
+            parts.append(minify_css(rebase_css_urls(text, path, ASSET_DIR)))
+        else:
+            parts.append(minify_js(text))
+    # Guard against a file that ends without a semicolon before the next one starts
+    data = (";\n" if kind == "js" else "").join(parts).encode("utf-8")
+    tmp = out_path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, out_path)
+
+
+def build_page(page, root, out_dir, inputs, state, force=False):
+    """Rewrite one page into out_dir; returns its report row."""
+    with open(os.path.join(root, page), "r", encoding="utf-8", newline="") as f:
+        lines = f.readlines()
+    runs = find_runs(lines, page, root, inputs.bundlable)
+
+    before = sum(len(run[3]) for run in runs)
+    before_bytes = sum(os.path.getsize(os.path.join(root, path)) for run in runs for path in run[3])
+    row = {"page": page, "requests": before, "bytes": before_bytes,
+           "bundles": [], "bundleRequests": len(runs), "bundleBytes": 0, "rebuilt": False}
+    if not runs:
+        return row
+
+    out_lines = []
+    previous = 0
+    for kind, first, last, files in runs:
+        name = bundle_name(kind, files, {path: inputs.digest(path) for path in files})
+        asset = os.path.join(ASSET_DIR, name)
+        out_path = os.path.join(out_dir, asset)
+        if force or not os.path.exists(out_path):
+            build_bundle(kind, files, root, out_path)
+        row["bundles"].append(asset)
+        row["bundleBytes"] += os.path.getsize(out_path)
+
+        indent = re.match(r"\s*", lines[first]).group(0)
+        eol = lines[first][len(lines[first].rstrip("\r\n")):]
+        href = os.path.relpath(asset, os.path.dirname(page) or ".").replace(os.sep, "/")
+        tag = f'<script src="{href}"></script>' if kind == "js" else f'<link rel="stylesheet" href="{href}">'
+        out_lines += lines[previous:first]
+        out_lines.append(f"{indent}{tag}{eol}")
+        previous = last + 1
+    out_lines += lines[previous:]
+
+    target = os.path.join(out_dir, page)
+    key = {"page": file_digest(os.path.join(root, page)), "bundles": row["bundles"]}
+    if force or state.get(page) != key or not os.path.exists(target):
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        with open(target, "w", encoding="utf-8", newline="") as f:
+            f.writelines(out_lines)
+        row["rebuilt"] = True
+    state[page] = key
+    return row
+
+
+def expand_pages(patterns, root):
+    pages = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(os.path.join(root, pattern))) if glob.has_magic(pattern) \
+            else [os.path.join(root, pattern)]
+        for path in matches:
+            page = os.path.relpath(path, root)
+            if page not in pages:
+                pages.append(page)
+    return pages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bundle, minify and fingerprint page assets.")
+    parser.add_argument("pages", nargs="*", help=f"pages or globs (default: {' '.join(DEFAULT_PAGES)})")
+    parser.add_argument("--root", default=HERE, help="site root the pages and assets live under")
+    parser.add_argument("--out", default="dist", help="overlay directory to write (default: dist)")
+    parser.add_argument("--force", action="store_true", help="rebuild every bundle and page")
+    args = parser.parse_args(argv)
+
+    root = os.path.abspath(args.root)
+    out_dir = os.path.abspath(args.out)
+    pages = expand_pages(args.pages or DEFAULT_PAGES, root)
+    missing = [page for page in pages if not os.path.isfile(os.path.join(root, page))]
+    if missing:
+        print(f"❌ ERROR: no such page: {', '.join(missing)}")
+        return 1
+
+    os.makedirs(os.path.join(out_dir, ASSET_DIR), exist_ok=True)
+    state_path = os.path.join(out_dir, BUILD_STATE)
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+    state = {"pages": state.get("pages", {}), "scripts": state.get("scripts", {})}
+
+    start = time.perf_counter()
+    inputs = Inputs(root, state["scripts"])
+    if inputs.node is None:
+        print("⚠️  node not found: scripts are bundled without a syntax check")
+    rows = [build_page(page, root, out_dir, inputs, state["pages"], args.force) for page in pages]
+
+    if not args.pages:
+        # A full build knows every bundle in use; drop the ones nothing references now
+        used = {os.path.basename(asset) for row in rows for asset in row["bundles"]}
+        for name in os.listdir(os.path.join(out_dir, ASSET_DIR)):
+            if name not in used:
+                os.remove(os.path.join(out_dir, ASSET_DIR, name))
+        state["pages"] = {page: entry for page, entry in state["pages"].items() if page in pages}
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    elapsed = time.perf_counter() - start
+
+    print(f"{'page':<36} {'requests':>12} {'KB before':>10} {'KB after':>9} {'saved':>6}")
+    for row in rows:
+        if not row["requests"]:
+            continue
+        saved = 1 - row["bundleBytes"] / row["bytes"] if row["bytes"] else 0
+        flag = "" if row["rebuilt"] else " (unchanged)"
+        print(f"{row['page']:<36} {row['requests']:>5} -> {row['bundleRequests']:<3} "
+              f"{row['bytes'] / 1024:>10.1f} {row['bundleBytes'] / 1024:>9.1f} {saved:>6.0%}{flag}")
+    before = sum(row["requests"] for row in rows)
+    after = sum(row["bundleRequests"] for row in rows)
+    before_bytes = sum(row["bytes"] for row in rows)
+    after_bytes = sum(row["bundleBytes"] for row in rows)
+    bundles = len({asset for row in rows for asset in row["bundles"]})
+    print(f"\n✅ {after} requests instead of {before}, {after_bytes / 1024:.1f} KB instead of "
+          f"{before_bytes / 1024:.1f} KB across {len(rows)} pages ({bundles} distinct bundles) "
+          f"in {elapsed * 1000:.0f} ms")
+    for path in inputs.broken:
+        print(f"⚠️  {path} does not parse; left out of bundles")
+    print(f"   Copy {args.out}/ over the site root to deploy.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
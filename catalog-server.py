@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Catalog query service for the storefront
+
+Loads the generator's output once and answers the queries
+js/browse-books.js runs in the browser (case-insensitive substring match
+on title or author, category, sort by price, 24 books per page), so a
+client fetches one page of results instead of the whole catalog.
+
+    GET /books?q=orwell&category=FICTION&sort=price-low&page=2
+    GET /health
+
+Text matches come from a trigram index over title and author and are
+verified as real substrings, so results are exactly the browser's.
+Category and price order come from CatalogIndex. The ordered ids of a
+query are kept in an LRU cache keyed on (q, category, sort), so paging
+through a result set filters and sorts the catalog once, and rendered
+pages are kept in a second LRU keyed on (q, category, sort, page). Cache
+misses run in a worker thread, so hits on other connections keep being
+served while a broad query is filtered. The catalog file (or a chunk
+directory's manifest) is polled, and on change the indexes are rebuilt
+in a worker thread and swapped in along with empty caches.
+
+Connections are HTTP/1.1 keep-alive.
+
+    python catalog-server.py [books-database.json|books-chunks|catalog.ndjson] [--port 8787]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from array import array
+from collections import OrderedDict
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+
+import books_catalog
+
+BOOKS_PER_PAGE = 24
+SORTS = ("price-low", "price-high")
+MAX_HEADER_LINES = 100
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+def read_catalog(path):
+    """All records of a pretty/minified JSON catalog, an NDJSON file or a chunk directory."""
+    if os.path.isdir(path):
+        manifest = os.path.join(path, books_catalog.ChunkWriter.MANIFEST)
+        with open(manifest, encoding="utf-8") as f:
+            chunks = json.load(f)["chunks"]
+        books = []
+        for entry in chunks:
+            with open(os.path.join(path, entry["file"]), encoding="utf-8") as f:
+                books.extend(json.load(f)["books"])
+        return books
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".ndjson"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)["books"]
+
+
+def catalog_signature(path):
+    """What changes when the catalog is rebuilt: size and mtime of the file or manifest."""
+    if os.path.isdir(path):
+        path = os.path.join(path, books_catalog.ChunkWriter.MANIFEST)
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PageCache:
+    """LRU map of rendered pages with hit/miss counters.
+
+    Unlike lru_cache it can be probed without computing the value, which
+    lets the server answer hits inline and send misses to a thread. Only
+    touched from the event loop.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.pages = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        body = self.pages.get(key)
+        if body is None:
+            self.misses += 1
+        else:
+            self.pages.move_to_end(key)
+            self.hits += 1
+        return body
+
+    def put(self, key, body):
+        self.pages[key] = body
+        self.pages.move_to_end(key)
+        if len(self.pages) > self.maxsize:
+            self.pages.popitem(last=False)
+
+
+class QueryEngine:
+    """In-memory indexes and the result and page caches for one version of the catalog."""
+
+    def __init__(self, books, cache_size=4096, result_cache_size=256):
+        self.books = books
+        self.index = books_catalog.CatalogIndex.build(books)
+        self.haystacks = self.index.texts  # shared with the index rather than built twice
+        postings = {}
+        for i, text in enumerate(self.haystacks):
+            for gram in trigrams(text):
+                postings.setdefault(gram, array("I")).append(i)
+        self.trigrams = postings
+        self.categories = {value.upper(): value for value in self.index.facets["category"]}
+        self.results = lru_cache(maxsize=result_cache_size)(self._results)
+        self.pages = PageCache(cache_size)
+        self.pending = {}  # page key -> future of a render running in a worker thread
+
+    def match_text(self, q):
+        """Ids of records whose title or author contains `q`, or None when there is no filter."""
+        if not q:
+            return None
+        grams = trigrams(q)
+        if not grams:
+            return {i for i, text in enumerate(self.haystacks) if q in text}
+        lists = sorted((self.trigrams.get(gram, ()) for gram in grams), key=len)
+        candidates = set(lists[0])
+        for ids in lists[1:]:
+            if not candidates:
+                break
+            candidates.intersection_update(ids)
+        haystacks = self.haystacks
+        return {i for i in candidates if q in haystacks[i]}
+
+    def query(self, q="", category=None, sort=None):
+        matches = self.match_text(q)
+        if category is not None:
+            ids = self.index.facets["category"].get(self.categories.get(category.upper()), ())
+            matches = set(ids) if matches is None else matches.intersection(ids)
+        return self.index.order(matches, sort)
+
+    def _results(self, q, category, sort):
+        return array("I", self.query(q, category, sort))
+
+    def render(self, q, category, sort, page):
+        """Encoded JSON body for one page of results."""
+        ids = self.results(q, category, sort)
+        pages = max(1, -(-len(ids) // BOOKS_PER_PAGE))
+        start = (page - 1) * BOOKS_PER_PAGE
+        result = {
+            "total": len(ids),
+            "page": page,
+            "pages": pages,
+            "perPage": BOOKS_PER_PAGE,
+            "books": [self.books[i] for i in ids[start:start + BOOKS_PER_PAGE]],
+        }
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def parse_query(query):
+    """Normalize query-string parameters into the cache key; raises ValueError on bad input."""
+    params = {key: values[-1] for key, values in parse_qs(query).items()}
+    q = params.get("q", "").lower()
+    category = params.get("category") or None
+    sort = params.get("sort") or None
+    if sort not in (None, "default") + SORTS:
+        raise ValueError(f"sort must be one of {', '.join(SORTS)}")
+    page = int(params.get("page", "1"))
+    if page < 1:
+        raise ValueError("page must be at least 1")
+    return q, category and category.upper(), None if sort == "default" else sort, page
+
+
+class CatalogServer:
+    def __init__(self, path, cache_size=4096, result_cache_size=256, poll=1.0):
+        self.path = path
+        self.cache_sizes = (cache_size, result_cache_size)
+        self.poll = poll
+        self.signature = catalog_signature(path)
+        self.engine = QueryEngine(read_catalog(path), *self.cache_sizes)
+        self.loaded = time.time()
+        self.reloads = 0
+
+    async def watch(self):
+        """Swap in a freshly built engine whenever the catalog changes on disk."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll)
+            try:
+                signature = catalog_signature(self.path)
+                if signature == self.signature:
+                    continue
+                books = await loop.run_in_executor(None, read_catalog, self.path)
+                engine = await loop.run_in_executor(None, QueryEngine, books, *self.cache_sizes)
+            except (OSError, ValueError, KeyError) as e:
+                # Caught mid-write; keep serving the old catalog and retry on the next poll
+                print(f"⚠️  reload of {self.path} failed: {e}", file=sys.stderr)
+                continue
+            self.engine, self.signature = engine, signature
+            self.loaded = time.time()
+            self.reloads += 1
+            print(f"✓ Reloaded {len(books)} books from {self.path}")
+
+    async def page(self, key):
+        """Body for one page: from the cache, or rendered in a worker thread."""
+        engine = self.engine
+        body = engine.pages.get(key)
+        if body is not None:
+            return body
+        future = engine.pending.get(key)
+        if future is not None:
+            return await future  # the same page is already being rendered for another client
+        future = engine.pending[key] = asyncio.get_running_loop().run_in_executor(None, engine.render, *key)
+        try:
+            body = await future
+        finally:
+            del engine.pending[key]
+        engine.pages.put(key, body)
+        return body
+
+    async def respond(self, method, target):
+        """(status, body) for one request."""
+        if method != "GET":
+            return 405, {"error": "only GET is supported"}
+        url = urlsplit(target)
+        if url.path == "/books":
+            try:
+                key = parse_query(url.query)
+            except ValueError as e:
+                return 400, {"error": str(e)}
+            return 200, await self.page(key)
+        if url.path == "/health":
+            pages, results = self.engine.pages, self.engine.results.cache_info()
+            return 200, {
+                "catalog": self.path,
+                "records": len(self.engine.books),
+                "loaded": self.loaded,
+                "reloads": self.reloads,
+                "cache": {"hits": pages.hits, "misses": pages.misses, "size": len(pages.pages),
+                          "max": pages.maxsize},
+                "results": {"hits": results.hits, "misses": results.misses, "size": results.currsize,
+                            "max": results.maxsize},
+            }
+        return 404, {"error": f"no route for {url.path}"}
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    # Without a usable length the body cannot be skipped, so the connection ends here
+                    keep_alive = False
+                    status, body = 400, {"error": f"invalid Content-Length {headers['content-length']!r}"}
+                else:
+                    if length:
+                        await reader.readexactly(length)
+                    connection = headers.get("connection", "").lower()
+                    keep_alive = connection == "keep-alive" if version == "HTTP/1.0" else connection != "close"
+                    status, body = await self.respond(method, target)
+                if not isinstance(body, bytes):
+                    body = json.dumps(body).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                    "Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Access-Control-Allow-Origin: *\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle, host, port)
+        watcher = asyncio.create_task(self.watch())
+        print(f"✓ Serving {len(self.engine.books)} books from {self.path} on http://{host}:{port}")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            watcher.cancel()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve paged catalog queries over HTTP.")
+    parser.add_argument("catalog", nargs="?", default="books-database.json",
+                        help="JSON or NDJSON catalog, or a chunk directory (default: books-database.json)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--cache-size", type=int, default=4096, help="pages kept in the LRU cache")
+    parser.add_argument("--result-cache", type=int, default=256,
+                        help="ordered result lists kept for paging (one per q/category/sort)")
+    parser.add_argument("--poll", type=float, default=1.0, help="seconds between catalog change checks")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.catalog):
+        print(f"❌ ERROR: {args.catalog} not found; run generate-books.py first")
+        return 1
+    server = CatalogServer(args.catalog, args.cache_size, args.result_cache, args.poll)
+    try:
+        asyncio.run(server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,151 +1,332 @@
+import argparse
+import hashlib
 import json
+import os
 import random
+import sys
+import time
 
-# Real book data with ISBNs - expanded collection
-books_data = [
-    # Fiction Classics (200 books)
-    {"title": "The Great Gatsby", "author": "F. Scott Fitzgerald", "isbn": "9780743273565", "category": "Fiction"},
-    {"title": "1984", "author": "George Orwell", "isbn": "9780451524935", "category": "Fiction"},
-    {"title": "To Kill a Mockingbird", "author": "Harper Lee", "isbn": "9780061120084", "category": "Fiction"},
-    {"title": "Pride and Prejudice", "author": "Jane Austen", "isbn": "9780141439518", "category": "Fiction"},
-    {"title": "The Catcher in the Rye", "author": "J.D. Salinger", "isbn": "9780316769174", "category": "Fiction"},
-    {"title": "The Hobbit", "author": "J.R.R. Tolkien", "isbn": "9780547928227", "category": "Fiction"},
-    {"title": "The Alchemist", "author": "Paulo Coelho", "isbn": "9780062315007", "category": "Fiction"},
-    {"title": "Animal Farm", "author": "George Orwell", "isbn": "9780451526342", "category": "Fiction"},
-    {"title": "Brave New World", "author": "Aldous Huxley", "isbn": "9780060850524", "category": "Fiction"},
-    {"title": "The Handmaid's Tale", "author": "Margaret Atwood", "isbn": "9780385490818", "category": "Fiction"},
-    {"title": "Lord of the Flies", "author": "William Golding", "isbn": "9780399501487", "category": "Fiction"},
-    {"title": "The Chronicles of Narnia", "author": "C.S. Lewis", "isbn": "9780066238500", "category": "Fiction"},
-    {"title": "Dune", "author": "Frank Herbert", "isbn": "9780441172719", "category": "Fiction"},
-    {"title": "The Lord of the Rings", "author": "J.R.R. Tolkien", "isbn": "9780544003415", "category": "Fiction"},
-    {"title": "The Da Vinci Code", "author": "Dan Brown", "isbn": "9780307474278", "category": "Fiction"},
-    {"title": "Angels & Demons", "author": "Dan Brown", "isbn": "9780671027360", "category": "Fiction"},
-    {"title": "The Hunger Games", "author": "Suzanne Collins", "isbn": "9780439023481", "category": "Fiction"},
-    {"title": "Divergent", "author": "Veronica Roth", "isbn": "9780062024039", "category": "Fiction"},
-    {"title": "The Fault in Our Stars", "author": "John Green", "isbn": "9780142424179", "category": "Fiction"},
-    {"title": "Gone Girl", "author": "Gillian Flynn", "isbn": "9780307588371", "category": "Fiction"},
-    {"title": "The Girl on the Train", "author": "Paula Hawkins", "isbn": "9781594634024", "category": "Fiction"},
-    {"title": "The Silent Patient", "author": "Alex Michaelides", "isbn": "9781250301697", "category": "Fiction"},
-    {"title": "Where the Crawdads Sing", "author": "Delia Owens", "isbn": "9780735219090", "category": "Fiction"},
-    {"title": "The Nightingale", "author": "Kristin Hannah", "isbn": "9780312577223", "category": "Fiction"},
-    {"title": "All the Light We Cannot See", "author": "Anthony Doerr", "isbn": "9781476746586", "category": "Fiction"},
-    {"title": "The Book Thief", "author": "Markus Zusak", "isbn": "9780375842207", "category": "Fiction"},
-    {"title": "Life of Pi", "author": "Yann Martel", "isbn": "9780156027328", "category": "Fiction"},
-    {"title": "The Kite Runner", "author": "Khaled Hosseini", "isbn": "9781594631931", "category": "Fiction"},
-    {"title": "A Thousand Splendid Suns", "author": "Khaled Hosseini", "isbn": "9781594489501", "category": "Fiction"},
-    {"title": "The Help", "author": "Kathryn Stockett", "isbn": "9780425232200", "category": "Fiction"},
-    
-    # Business & Self-Help (200 books)
-    {"title": "Atomic Habits", "author": "James Clear", "isbn": "9780735211292", "category": "Business"},
-    {"title": "The Lean Startup", "author": "Eric Ries", "isbn": "9780307887894", "category": "Business"},
-    {"title": "Zero to One", "author": "Peter Thiel", "isbn": "9780804139298", "category": "Business"},
-    {"title": "The 7 Habits of Highly Effective People", "author": "Stephen Covey", "isbn": "9781982137274", "category": "Business"},
-    {"title": "Deep Work", "author": "Cal Newport", "isbn": "9781455586691", "category": "Business"},
-    {"title": "The 4-Hour Workweek", "author": "Timothy Ferriss", "isbn": "9780307465351", "category": "Business"},
-    {"title": "Good to Great", "author": "Jim Collins", "isbn": "9780066620992", "category": "Business"},
-    {"title": "Built to Last", "author": "Jim Collins", "isbn": "9780060516406", "category": "Business"},
-    {"title": "The Innovator's Dilemma", "author": "Clayton M. Christensen", "isbn": "9781633691780", "category": "Business"},
-    {"title": "Start with Why", "author": "Simon Sinek", "isbn": "9781591846444", "category": "Business"},
-    {"title": "Leaders Eat Last", "author": "Simon Sinek", "isbn": "9781591848011", "category": "Business"},
-    {"title": "The Infinite Game", "author": "Simon Sinek", "isbn": "9780735213500", "category": "Business"},
-    {"title": "Dare to Lead", "author": "Brené Brown", "isbn": "9780399592522", "category": "Business"},
-    {"title": "The Five Dysfunctions of a Team", "author": "Patrick Lencioni", "isbn": "9780787960759", "category": "Business"},
-    {"title": "Crucial Conversations", "author": "Kerry Patterson", "isbn": "9780071771320", "category": "Business"},
-    {"title": "Influence", "author": "Robert B. Cialdini", "isbn": "9780061241895", "category": "Business"},
-    {"title": "Drive", "author": "Daniel H. Pink", "isbn": "9781594484803", "category": "Business"},
-    {"title": "Essentialism", "author": "Greg McKeown", "isbn": "9780804137386", "category": "Business"},
-    {"title": "The One Thing", "author": "Gary Keller", "isbn": "9781885167774", "category": "Business"},
-    {"title": "Getting Things Done", "author": "David Allen", "isbn": "9780143126560", "category": "Business"},
-    {"title": "The E-Myth Revisited", "author": "Michael E. Gerber", "isbn": "9780887307287", "category": "Business"},
-    {"title": "Rework", "author": "Jason Fried", "isbn": "9780307463746", "category": "Business"},
-    {"title": "The Hard Thing About Hard Things", "author": "Ben Horowitz", "isbn": "9780062273208", "category": "Business"},
-    {"title": "Blue Ocean Strategy", "author": "W. Chan Kim", "isbn": "9781591396192", "category": "Business"},
-    {"title": "The Lean Six Sigma Pocket Toolbook", "author": "Michael L. George", "isbn": "9780071441193", "category": "Business"},
-    
-    # Non-Fiction (200 books)
-    {"title": "Thinking, Fast and Slow", "author": "Daniel Kahneman", "isbn": "9780374533557", "category": "Non-Fiction"},
-    {"title": "The Power of Now", "author": "Eckhart Tolle", "isbn": "9781577314806", "category": "Non-Fiction"},
-    {"title": "Educated", "author": "Tara Westover", "isbn": "9780399590504", "category": "Non-Fiction"},
-    {"title": "Becoming", "author": "Michelle Obama", "isbn": "9781524763138", "category": "Non-Fiction"},
-    {"title": "The Subtle Art of Not Giving a F*ck", "author": "Mark Manson", "isbn": "9780062457714", "category": "Non-Fiction"},
-    {"title": "The Immortal Life of Henrietta Lacks", "author": "Rebecca Skloot", "isbn": "9781400052189", "category": "Non-Fiction"},
-    {"title": "Outliers", "author": "Malcolm Gladwell", "isbn": "9780316017930", "category": "Non-Fiction"},
-    {"title": "Blink", "author": "Malcolm Gladwell", "isbn": "9780316010665", "category": "Non-Fiction"},
-    {"title": "The Tipping Point", "author": "Malcolm Gladwell", "isbn": "9780316346627", "category": "Non-Fiction"},
-    {"title": "Freakonomics", "author": "Steven D. Levitt", "isbn": "9780060731328", "category": "Non-Fiction"},
-    {"title": "Mindset", "author": "Carol S. Dweck", "isbn": "9780345472328", "category": "Non-Fiction"},
-    {"title": "Grit", "author": "Angela Duckworth", "isbn": "9781501111105", "category": "Non-Fiction"},
-    {"title": "The Power of Habit", "author": "Charles Duhigg", "isbn": "9780812981605", "category": "Non-Fiction"},
-    {"title": "Shoe Dog", "author": "Phil Knight", "isbn": "9781501135910", "category": "Non-Fiction"},
-    {"title": "Steve Jobs", "author": "Walter Isaacson", "isbn": "9781451648539", "category": "Non-Fiction"},
-    {"title": "Elon Musk", "author": "Ashlee Vance", "isbn": "9780062301239", "category": "Non-Fiction"},
-    {"title": "The Everything Store", "author": "Brad Stone", "isbn": "9780316219266", "category": "Non-Fiction"},
-    {"title": "Bad Blood", "author": "John Carreyrou", "isbn": "9781524731656", "category": "Non-Fiction"},
-    
-    # Science & Tech (200 books)
-    {"title": "Clean Code", "author": "Robert C. Martin", "isbn": "9780132350884", "category": "Science & Tech"},
-    {"title": "Design Patterns", "author": "Gang of Four", "isbn": "9780201633610", "category": "Science & Tech"},
-    {"title": "A Brief History of Time", "author": "Stephen Hawking", "isbn": "9780553380163", "category": "Science & Tech"},
-    {"title": "The Selfish Gene", "author": "Richard Dawkins", "isbn": "9780198788607", "category": "Science & Tech"},
-    {"title": "Cosmos", "author": "Carl Sagan", "isbn": "9780345539434", "category": "Science & Tech"},
-    {"title": "The Origin of Species", "author": "Charles Darwin", "isbn": "9780451529060", "category": "Science & Tech"},
-    {"title": "The Double Helix", "author": "James D. Watson", "isbn": "9780743216302", "category": "Science & Tech"},
-    {"title": "The Code Breaker", "author": "Walter Isaacson", "isbn": "9781982115852", "category": "Science & Tech"},
-    {"title": "The Gene", "author": "Siddhartha Mukherjee", "isbn": "9781476733524", "category": "Science & Tech"},
-    {"title": "Astrophysics for People in a Hurry", "author": "Neil deGrasse Tyson", "isbn": "9780393609394", "category": "Science & Tech"},
-    {"title": "The Elegant Universe", "author": "Brian Greene", "isbn": "9780393338102", "category": "Science & Tech"},
-    {"title": "The Pragmatic Programmer", "author": "Andrew Hunt", "isbn": "9780135957059", "category": "Science & Tech"},
-    {"title": "Introduction to Algorithms", "author": "Thomas H. Cormen", "isbn": "9780262033848", "category": "Science & Tech"},
-    {"title": "The Mythical Man-Month", "author": "Frederick P. Brooks Jr.", "isbn": "9780201835953", "category": "Science & Tech"},
-    {"title": "Code Complete", "author": "Steve McConnell", "isbn": "9780735619678", "category": "Science & Tech"},
-    {"title": "Refactoring", "author": "Martin Fowler", "isbn": "9780134757599", "category": "Science & Tech"},
-    {"title": "Domain-Driven Design", "author": "Eric Evans", "isbn": "9780321125217", "category": "Science & Tech"},
-    {"title": "The Phoenix Project", "author": "Gene Kim", "isbn": "9780988262508", "category": "Science & Tech"},
-    {"title": "The DevOps Handbook", "author": "Gene Kim", "isbn": "9781942788003", "category": "Science & Tech"},
-    {"title": "Site Reliability Engineering", "author": "Niall Richard Murphy", "isbn": "9781491929124", "category": "Science & Tech"},
-    {"title": "Designing Data-Intensive Applications", "author": "Martin Kleppmann", "isbn": "9781449373320", "category": "Science & Tech"},
-    
-    # History (100 books)
-    {"title": "Sapiens", "author": "Yuval Noah Harari", "isbn": "9780062316097", "category": "History"},
-    {"title": "The Art of War", "author": "Sun Tzu", "isbn": "9781599869773", "category": "History"},
-    {"title": "Guns, Germs, and Steel", "author": "Jared Diamond", "isbn": "9780393317558", "category": "History"},
-]
-
-# Generate 2000 books by repeating and varying the base data
-def generate_books(count=2000):
-    books = []
-    gradients = ["gatsby", "orwell", "code", "patterns", "alchemist", "sapiens"]
-    conditions = ["New", "Like New", "Used"]
-    stocks = ["In Stock", "Low Stock", "Limited Stock"]
-    
-    for i in range(count):
-        base_book = books_data[i % len(books_data)]
-        
-        # Add variation to create unique entries
-        variation_suffix = f" - Edition {(i // len(books_data)) + 1}" if i >= len(books_data) else ""
-        
-        book = {
-            "title": base_book["title"] + variation_suffix,
-            "author": base_book["author"],
-            "price": round(random.uniform(8.99, 89.99), 2),
-            "category": base_book["category"],
-            "condition": random.choice(conditions),
-            "stock": random.choice(stocks),
-            "gradient": random.choice(gradients),
-            "isbn": base_book["isbn"],
-            "cover": f"https://covers.openlibrary.org/b/isbn/{base_book['isbn']}-L.jpg"
-        }
-        books.append(book)
-    
-    return books
-
-# Generate and save
-books = generate_books(2000)
-output = {"books": books}
-
-with open('books-database.json', 'w', encoding='utf-8') as f:
-    json.dump(output, f, indent=2, ensure_ascii=False)
-
-print(f"✓ Generated {len(books)} books")
-print(f"✓ Saved to books-database.json")
-print(f"✓ File size: {len(json.dumps(output)) / 1024:.2f} KB")
+from books_catalog import (
+    FORMATS, BuildMetrics, ChunkWriter, ColumnarWriter, IndexBuilder, PrettyJsonSink, PreviewSink, books_data,
+    build_sharded, compress_outputs, export, export_batches, generator_fingerprint, iter_books, iter_column_batches,
+    np, part_path, print_compression_report, print_metrics, read_catalogs, replace_if_changed, sink_outputs,
+)
+
+
+def parse_formats(text):
+    formats = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in formats if name not in FORMATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown format(s): {', '.join(unknown)} (choose from {', '.join(FORMATS)})")
+    return formats
+
+
+def build_sinks(args, sharded=False, suffix="", reuse=None):
+    """Create the sinks requested on the command line.
+
+    `suffix` is appended to single-file outputs (incremental builds write to
+    temporary names first); `reuse` is passed on to the chunk writer.
+    """
+    out_dir = os.path.dirname(args.output)
+    sinks = []
+    for name in args.formats:
+        if name == "pretty":
+            if not sharded:
+                sinks.append(PrettyJsonSink(args.output + suffix))
+        elif name == "preview":
+            sinks.append(PreviewSink(os.path.join(out_dir, FORMATS[name][1]) + suffix, args.preview_count))
+        else:
+            sink_type, file_name = FORMATS[name]
+            sinks.append(sink_type(os.path.join(out_dir, file_name) + suffix))
+    if args.chunk_size:
+        sinks.append(ChunkWriter(args.chunk_dir, args.chunk_size, reuse))
+    if args.index:
+        sinks.append(IndexBuilder(args.index + suffix))
+    if args.columnar:
+        sinks.append(ColumnarWriter(args.columnar + suffix))
+    return sinks
+
+
+def output_groups(args):
+    """(label, files) for every output an incremental build keeps, as found on disk."""
+    out_dir = os.path.dirname(args.output)
+    paths = [args.output if name == "pretty" else os.path.join(out_dir, FORMATS[name][1]) for name in args.formats]
+    groups = [(path, [path]) for path in paths]
+    if args.chunk_size:
+        chunks = ChunkWriter.load_manifest(args.chunk_dir, args.chunk_size)
+        files = [os.path.join(args.chunk_dir, chunk["file"]) for chunk in chunks]
+        files.append(os.path.join(args.chunk_dir, ChunkWriter.MANIFEST))
+        groups.append((f"{args.chunk_dir}/ ({len(files)} files)", files))
+    groups += [(path, [path]) for path in (args.index, args.columnar) if path]
+    return groups
+
+
+# Incremental build state, kept next to --output
+BUILD_STATE = ".books-build.json"
+BUILD_RECORDS = ".books-build.records"  # 8-byte digest per record, in record order
+
+
+def _entry_hashes():
+    return [
+        hashlib.blake2b(json.dumps(entry, sort_keys=True).encode("utf-8"), digest_size=8).hexdigest()
+        for entry in books_data
+    ]
+
+
+def _record_digest(book):
+    data = json.dumps(book, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).digest()
+
+
+def _file_stats(paths):
+    stats = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stats[path] = [st.st_size, st.st_mtime_ns]
+    return stats
+
+
+def incremental_build(args, metrics=None):
+    """Rebuild only what changed since the last incremental build.
+
+    The state file records the build options (including a fingerprint of
+    the generator's constants and code), a hash per books_data entry,
+    a digest per generated record, the chunk manifest entries and the
+    size/mtime of every output. If none of those moved the build returns
+    without generating anything. Otherwise only records derived from
+    edited seed entries are re-serialized to find real changes. Then only
+    the chunks holding them, or whose files changed since this build wrote
+    them, are rewritten, and single-file artifacts are replaced only when
+    their bytes differ.
+
+    Returns (record count, stats), or None when up to date.
+    """
+    out_dir = os.path.dirname(args.output)
+    state_path = os.path.join(out_dir, BUILD_STATE)
+    records_path = os.path.join(out_dir, BUILD_RECORDS)
+    options = {
+        "count": args.count, "seed": args.seed, "shards": args.shards, "normalize": args.normalize,
+        "formats": args.formats, "previewCount": args.preview_count, "chunkSize": args.chunk_size,
+        "chunkDir": args.chunk_dir, "index": args.index, "columnar": args.columnar,
+        "generator": generator_fingerprint(),
+    }
+    entries = _entry_hashes()
+    try:
+        with open(state_path, encoding="utf-8") as f:
+            state = json.load(f)
+        with open(records_path, "rb") as f:
+            old_digests = f.read()
+    except (OSError, ValueError):
+        state, old_digests = None, b""
+
+    current = _file_stats(state["files"]) if state else {}
+    if state and state["options"] == options and state["entries"] == entries and current == state["files"]:
+        return None
+
+    # Pass 1: find the records whose content actually changed
+    same_layout = bool(state) and state["options"] == options and len(state["entries"]) == len(entries) \
+        and len(old_digests) == 8 * args.count
+    edited = {k for k, (old, new) in enumerate(zip(state["entries"], entries)) if old != new} if same_layout else None
+    digests = bytearray()
+    changed = []
+    diff_start = time.perf_counter()
+    for i, book in enumerate(iter_books(args.count, args.seed, args.shards, args.normalize)):
+        old = old_digests[8 * i:8 * i + 8]
+        if edited is not None and i % len(books_data) not in edited:
+            digests += old
+            continue
+        digest = _record_digest(book)
+        digests += digest
+        if digest != old:
+            changed.append(i)
+    if metrics is not None:
+        metrics.add("diff", time.perf_counter() - diff_start, args.count)
+
+    # Pass 2: rewrite dirty chunks and any single-file artifact whose bytes moved
+    # Only chunks still holding what this build wrote are reused: sync-seller-books.py
+    # rewrites chunks and the manifest in place, and those must be regenerated.
+    reuse = {}
+    if args.chunk_size and same_layout:
+        dirty = {i // args.chunk_size for i in changed}
+        for n, chunk in enumerate(state.get("chunks", [])):
+            path = os.path.join(args.chunk_dir, chunk["file"])
+            if n not in dirty and path in current and current[path] == state["files"][path]:
+                reuse[n] = chunk
+    sinks = build_sinks(args, suffix=".tmp", reuse=reuse)
+    count, stats = export(iter_books(args.count, args.seed, args.shards, args.normalize, metrics), sinks, metrics)
+
+    outputs, chunks = [], []
+    for sink, stat in zip(sinks, stats):
+        if isinstance(sink, ChunkWriter):
+            chunks = sink.chunks
+            stat["written"] = sink.written
+            outputs.append(os.path.join(sink.directory, sink.MANIFEST))
+            outputs += [os.path.join(sink.directory, chunk["file"]) for chunk in sink.chunks]
+        else:
+            stat["path"] = sink.path[:-len(".tmp")]
+            stat["written"] = int(replace_if_changed(sink.path, stat["path"]))
+            if not stat["written"]:
+                stat["bytes"] = 0
+            outputs.append(stat["path"])
+
+    with open(records_path, "wb") as f:
+        f.write(digests)
+    with open(state_path, "w", encoding="utf-8") as f:
+        json.dump({"options": options, "entries": entries, "chunks": chunks, "files": _file_stats(outputs)}, f)
+    print(f"✓ {len(changed)} of {count} records changed")
+    return count, stats
+
+
+def compress(groups, args, metrics=None):
+    start = time.perf_counter()
+    encodings, rows = compress_outputs(groups, os.path.dirname(args.output), args.workers)
+    if metrics is not None:
+        metrics.add_compression(time.perf_counter() - start, encodings, rows)
+    return encodings, rows
+
+
+def report_metrics(args, metrics, count):
+    """Print (--profile) and/or save (--metrics-json) the build metrics."""
+    if metrics is None:
+        return
+    config = {
+        "count": args.count, "seed": args.seed, "shards": args.shards, "backend": args.backend,
+        "normalize": args.normalize, "formats": args.formats, "chunkSize": args.chunk_size,
+        "index": bool(args.index), "columnar": bool(args.columnar), "incremental": args.incremental,
+        "compress": args.compress,
+    }
+    data = metrics.to_dict(config, count, args.profile_top if args.profile else 0)
+    if args.profile:
+        print()
+        print_metrics(data)
+    if args.metrics_json:
+        with open(args.metrics_json, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+            f.write("\n")
+        print(f"✓ Metrics written to {args.metrics_json}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate the ShelfSync books catalog.")
+    parser.add_argument("--count", type=int, default=2000, help="number of books to generate (default: 2000)")
+    parser.add_argument("--output", default="books-database.json",
+                        help="pretty catalog file; other formats are written next to it")
+    parser.add_argument("--formats", type=parse_formats, default=["pretty"],
+                        help=f"comma-separated artifacts to emit: {', '.join(FORMATS)} (default: pretty)")
+    parser.add_argument("--preview-count", type=int, default=100, help="records in the preview artifact")
+    parser.add_argument("--no-normalize", dest="normalize", action="store_false",
+                        help="keep generated values (title-case enums, USD prices) instead of the storefront form")
+    parser.add_argument("--seed", type=int, help="master seed for reproducible output")
+    parser.add_argument("--shards", type=int, default=1, help="split generation across N worker processes")
+    parser.add_argument("--workers", type=int, help="process pool size (default: min(shards, CPU count))")
+    parser.add_argument("--keep-parts", action="store_true",
+                        help="leave shard files as <output>.part-NNNNN.json instead of merging")
+    parser.add_argument("--chunk-size", type=int, default=0,
+                        help="also write page chunks of N books (the storefront uses 24)")
+    parser.add_argument("--chunk-dir", default="books-chunks", help="directory for page chunks and their manifest")
+    parser.add_argument("--index", metavar="PATH", help="also write a search/facet index (e.g. books-index.json)")
+    parser.add_argument("--columnar", metavar="PATH", help="also write the columnar binary catalog (e.g. books.ssc)")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"only rewrite outputs that changed since the last build (needs --seed; state in {BUILD_STATE})")
+    parser.add_argument("--backend", choices=["python", "numpy"], default="python",
+                        help="record generator; numpy draws whole columns at once (falls back to python if missing)")
+    parser.add_argument("--compress", action="store_true",
+                        help="write precompressed .gz (and .br if brotli is installed) siblings for every output")
+    parser.add_argument("--profile", action="store_true",
+                        help="print per-stage timings and a cProfile summary of the generation loop")
+    parser.add_argument("--profile-top", type=int, default=20, metavar="N", help="functions in the cProfile summary")
+    parser.add_argument("--metrics-json", metavar="PATH",
+                        help="write per-stage timings, record/byte counts and peak RSS as JSON")
+    args = parser.parse_args(argv)
+    if args.count < 0:
+        parser.error("--count must not be negative")
+    if args.shards < 1:
+        parser.error("--shards must be at least 1")
+    if args.chunk_size < 0:
+        parser.error("--chunk-size must not be negative")
+    sharded = args.shards > 1 or args.keep_parts
+    if sharded and "pretty" not in args.formats:
+        parser.error("--shards/--keep-parts build the pretty catalog; include it in --formats")
+    if args.incremental and (args.seed is None or args.keep_parts):
+        parser.error("--incremental needs a fixed --seed and cannot be combined with --keep-parts")
+    if args.backend == "numpy" and np is None:
+        print("⚠️  NumPy is not installed, using the Python backend")
+        args.backend = "python"
+    if args.backend == "numpy" and (sharded or args.incremental):
+        parser.error("--backend numpy generates in-process; drop --shards/--keep-parts/--incremental")
+
+    metrics = BuildMetrics() if args.profile or args.metrics_json else None
+
+    def profiled(fn, *fn_args):
+        return metrics.run_profiled(fn, *fn_args) if args.profile else fn(*fn_args)
+
+    if args.incremental:
+        start = time.perf_counter()
+        result = profiled(incremental_build, args, metrics)
+        if result is None:
+            count = 0
+            print(f"✓ Catalog up to date ({(time.perf_counter() - start) * 1000:.1f} ms)")
+        else:
+            count, stats = result
+            print(f"✓ Generated {count} books")
+            for stat in stats:
+                print(f"✓ {stat['sink']:<9} {stat['path']:<32} {stat['written']:>6} written "
+                      f"{stat['bytes'] / 1024:>12.2f} KB {stat['seconds']:>8.3f}s")
+        if args.compress:
+            # Also on a no-op run: siblings may be missing or older than the outputs
+            print()
+            print_compression_report(*compress(output_groups(args), args, metrics))
+        report_metrics(args, metrics, count)
+        return 0
+
+    sinks = build_sinks(args, sharded)
+    stats = []
+    if sharded:
+        if args.seed is None:
+            args.seed = random.SystemRandom().randrange(2 ** 32)
+            print(f"✓ Using seed {args.seed}")
+        start = time.perf_counter()
+        count, size = build_sharded(args.count, args.output, args.seed, args.shards,
+                                    args.workers, args.keep_parts, args.normalize)
+        path = part_path(args.output, 0).replace("00000", "*") if args.keep_parts else args.output
+        stats.append({"sink": "pretty", "path": path, "records": count, "bytes": size,
+                      "seconds": time.perf_counter() - start})
+        if metrics is not None:
+            metrics.add("shards", stats[0]["seconds"], count, size)
+        sink_stats = []
+        if sinks:
+            # Feed the remaining sinks from what the shards wrote instead of generating it all again here
+            parts = [part_path(args.output, shard) for shard in range(args.shards)]
+            books = read_catalogs(parts if args.keep_parts else [args.output])
+            if metrics is not None:
+                books = metrics.timed_iter("parse", books)
+            _, sink_stats = profiled(export, books, sinks, metrics)
+    elif args.backend == "numpy":
+        batches = iter_column_batches(args.count, args.seed, normalize=args.normalize)
+        count, sink_stats = profiled(export_batches, batches, sinks, metrics)
+    else:
+        books = iter_books(args.count, args.seed, args.shards, args.normalize, metrics)
+        count, sink_stats = profiled(export, books, sinks, metrics)
+    stats += sink_stats
+
+    print(f"✓ Generated {count} books")
+    for stat in stats:
+        print(f"✓ {stat['sink']:<9} {stat['path']:<32} {stat['records']:>8} records "
+              f"{stat['bytes'] / 1024:>12.2f} KB {stat['seconds']:>8.3f}s")
+
+    if args.compress:
+        groups = [sink_outputs(sink) for sink in sinks]
+        if sharded:
+            parts = [part_path(args.output, shard) for shard in range(args.shards)]
+            groups.insert(0, (stats[0]["path"], parts if args.keep_parts else [args.output]))
+        print()
+        print_compression_report(*compress(groups, args, metrics))
+    report_metrics(args, metrics, count)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
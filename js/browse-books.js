@@ -6,6 +6,8 @@ let allBooks = [];
 let displayBooks = [];
 let sellerBooks = [];
 let currentPage = 1;
+let searchQuery = "";
+let pendingTotal = null; // catalog size while only the first chunk is shown
 const booksPerPage = 24;
 
 /* -------------------------------
@@ -30,16 +32,56 @@ function waitForSupabase() {
 async function loadAllBooks() {
     showLoader("Loading 2000+ books...");
 
-    const jsonBooks = await loadJsonBooks();
-    const seller = await loadSellerBooks();
+    // Start the full catalog download first, then paint page 1 from the
+    // first pre-built chunk while it is still in flight
+    const jsonRequest = loadJsonBooks();
+    const firstChunk = await loadFirstChunk();
+    if (firstChunk.books.length) {
+        allBooks = firstChunk.books;
+        pendingTotal = firstChunk.total;
+        applyQuery();
+    }
+
+    const jsonBooks = await jsonRequest;
+    const delta = await loadSellerDelta();
 
-    // Merge both sources
-    allBooks = [...jsonBooks, ...seller];
-    displayBooks = [...allBooks];
+    if (delta && delta.base === jsonBooks.length) {
+        // Seller listings already merged by ISBN (sync-seller-books.py), patched in place
+        delta.books.forEach(({ position, book }) => { jsonBooks[position] = book; });
+        allBooks = jsonBooks;
+    } else {
+        if (delta) {
+            // Delta was synced against another build of the catalog; its positions would land on the wrong books
+            console.warn(`Seller delta is for ${delta.base} books, catalog has ${jsonBooks.length}; querying Supabase`);
+        }
+        // Merge both sources
+        const seller = await loadSellerBooks();
+        allBooks = [...jsonBooks, ...seller];
+    }
+    pendingTotal = null;
 
     console.log("TOTAL BOOKS:", allBooks.length);
 
-    showPage(1);
+    // Keep whatever was searched or sorted while the first chunk was on screen
+    applyQuery();
+}
+
+/* -------------------------------
+   Load First Chunk
+   (books-chunks/ is written by generate-books.py --chunk-size 24)
+--------------------------------*/
+async function loadFirstChunk() {
+    try {
+        const manifest = await (await fetch("../books-chunks/manifest.json")).json();
+        if (!manifest.chunks || !manifest.chunks.length) return { books: [], total: 0 };
+
+        const res = await fetch(`../books-chunks/${manifest.chunks[0].file}`);
+        const data = await res.json();
+        return { books: data.books.slice(0, booksPerPage), total: manifest.total };
+    } catch (e) {
+        // No chunks published, fall back to the full catalog only
+        return { books: [], total: 0 };
+    }
 }
 
 /* -------------------------------
@@ -57,6 +99,23 @@ async function loadJsonBooks() {
     }
 }
 
+/* -------------------------------
+   Load Seller Delta
+   (books-chunks/seller-delta.json is written by sync-seller-books.py)
+--------------------------------*/
+async function loadSellerDelta() {
+    try {
+        const res = await fetch("../books-chunks/seller-delta.json");
+        if (!res.ok) return null;
+        const delta = await res.json();
+        console.log("Seller books (delta):", delta.books.length);
+        return delta;
+    } catch (e) {
+        // No synced delta published, query Supabase directly
+        return null;
+    }
+}
+
 /* -------------------------------
    Load Seller Books
 --------------------------------*/
@@ -200,8 +259,10 @@ function updatePageInfo() {
 
     const start = (currentPage - 1) * booksPerPage + 1;
     const end = Math.min(currentPage * booksPerPage, displayBooks.length);
+    // Until the full catalog arrives only the first chunk is loaded; report the real size
+    const total = pendingTotal !== null && !searchQuery ? pendingTotal : displayBooks.length;
 
-    el.textContent = `Showing ${start}-${end} of ${displayBooks.length} books`;
+    el.textContent = `Showing ${start}-${end} of ${total} books`;
 }
 
 /* -------------------------------
@@ -280,26 +341,34 @@ function updatePagination() {
    Search
 --------------------------------*/
 window.handleSearch = q => {
-    q = q.toLowerCase();
-    displayBooks = allBooks.filter(b =>
-        b.title.toLowerCase().includes(q) ||
-        b.author.toLowerCase().includes(q)
-    );
-    showPage(1);
+    searchQuery = q.toLowerCase();
+    applyQuery();
 };
 
 /* -------------------------------
-   Sorting
+   Search + Sort over allBooks
 --------------------------------*/
-window.handleSort = () => {
-    const v = document.getElementById("sortSelect").value;
-
+function applyQuery() {
+    const q = searchQuery;
+    displayBooks = q
+        ? allBooks.filter(b =>
+            b.title.toLowerCase().includes(q) ||
+            b.author.toLowerCase().includes(q)
+        )
+        : [...allBooks];
+
+    const select = document.getElementById("sortSelect");
+    const v = select ? select.value : "";
     if (v === "price-low") displayBooks.sort((a, b) => a.price - b.price);
     else if (v === "price-high") displayBooks.sort((a, b) => b.price - a.price);
-    else displayBooks = [...allBooks];
 
     showPage(1);
-};
+}
+
+/* -------------------------------
+   Sorting
+--------------------------------*/
+window.handleSort = () => applyQuery();
 
 /* -------------------------------
    Quick View Functionality
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Load test for catalog-server.py
+
+Opens --connections keep-alive connections and sends GET /books requests
+drawn from a storefront-like mix: mostly the first pages of popular
+searches (cache hits), plus a tail of deeper pages and one-off searches.
+Reports requests per second, latency percentiles and the server's cache
+hit rate.
+
+    python load-test-catalog.py [--url http://127.0.0.1:8787] [--connections 32] [--requests 20000]
+    python load-test-catalog.py --spawn books-database.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from urllib.parse import urlencode, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+HOT_QUERIES = [
+    {},
+    {"sort": "price-low"},
+    {"sort": "price-high"},
+    {"q": "harry"},
+    {"q": "orwell"},
+    {"q": "habits"},
+    {"category": "FICTION"},
+    {"category": "BUSINESS", "sort": "price-low"},
+]
+COLD_WORDS = ["the", "of", "edition", "war", "love", "life", "man", "world", "art", "king", "ea", "st"]
+
+
+def request_mix(rng, count, hot_share=0.8):
+    """`count` request targets: hot queries on early pages, then a long tail."""
+    targets = []
+    for _ in range(count):
+        if rng.random() < hot_share:
+            params = dict(rng.choice(HOT_QUERIES), page=rng.choice([1, 1, 1, 2, 3]))
+        else:
+            params = {"q": rng.choice(COLD_WORDS) + rng.choice(["", " ", "s", "e", "in"]),
+                      "sort": rng.choice(["default", "price-low", "price-high"]),
+                      "page": rng.randint(1, 40)}
+        targets.append("/books?" + urlencode(params))
+    return targets
+
+
+async def fetch(reader, writer, host, target):
+    writer.write(f"GET {target} HTTP/1.1\r\nHost: {host}\r\n\r\n".encode("latin-1"))
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    body = await reader.readexactly(length)
+    return status, body
+
+
+async def client(host, port, targets, latencies, failures):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        for target in targets:
+            start = time.perf_counter()
+            status, _ = await fetch(reader, writer, host, target)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                failures.append((status, target))
+    finally:
+        writer.close()
+
+
+async def health(host, port):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        _, body = await fetch(reader, writer, host, "/health")
+        return json.loads(body)
+    finally:
+        writer.close()
+
+
+async def wait_for_server(host, port, timeout=60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await health(host, port)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[k]
+
+
+async def run(host, port, connections, requests, seed, warmup):
+    before = await wait_for_server(host, port)
+    targets = request_mix(random.Random(seed), requests)
+    if warmup:
+        await client(host, port, targets[:warmup], [], [])
+
+    latencies, failures = [], []
+    per_connection = [targets[i::connections] for i in range(connections)]
+    start = time.perf_counter()
+    await asyncio.gather(*(client(host, port, share, latencies, failures) for share in per_connection if share))
+    elapsed = time.perf_counter() - start
+    after = await health(host, port)
+    return before, after, sorted(latencies), failures, elapsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the catalog query service.")
+    parser.add_argument("--url", default="http://127.0.0.1:8787")
+    parser.add_argument("--connections", type=int, default=32, help="concurrent keep-alive connections")
+    parser.add_argument("--requests", type=int, default=20000, help="total requests to send")
+    parser.add_argument("--warmup", type=int, default=0, help="requests sent before timing starts")
+    parser.add_argument("--seed", type=int, default=1, help="seed for the request mix")
+    parser.add_argument("--spawn", metavar="CATALOG", help="start catalog-server.py on this catalog first")
+    args = parser.parse_args(argv)
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, os.path.join(HERE, "catalog-server.py"), args.spawn,
+                                   "--host", host, "--port", str(port)], stdout=subprocess.DEVNULL)
+    try:
+        before, after, latencies, failures, elapsed = asyncio.run(
+            run(host, port, args.connections, args.requests, args.seed, args.warmup))
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    hits = after["cache"]["hits"] - before["cache"]["hits"]
+    misses = after["cache"]["misses"] - before["cache"]["misses"]
+    print(f"✓ {len(latencies)} requests over {args.connections} connections "
+          f"against {after['records']} books in {elapsed:.2f}s")
+    print(f"{'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'cache hit':>10}")
+    print(f"{len(latencies) / elapsed:>10,.0f} "
+          + " ".join(f"{percentile(latencies, p) * 1000:>8.2f}" for p in (50, 95, 99, 100))
+          + f" {hits / max(hits + misses, 1):>10.1%}")
+    if failures:
+        print(f"❌ {len(failures)} non-200 responses, first: {failures[0]}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
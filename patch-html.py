@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Data-driven HTML patch engine (generalizes the old apply-map-fix.py scripts)
+
+A patch set is a JSON file:
+
+    {
+      "files": ["pages/*.html"],
+      "patches": [
+        {"type": "insert-after", "anchor": "...", "lines": ["..."]},
+        {"type": "remove-block", "start": "...", "contains": "...", "end": "...", "blank_after": true},
+        {"type": "replace-function-body", "name": "openAddAddressMode", "body": ["..."]}
+      ]
+    }
+
+All patches for a file are applied in a single scan over its lines (lines a
+patch held back without changing are scanned again for the others), files are
+processed in a worker pool, and line endings are preserved the way v2 does
+(CRLF files stay CRLF, inserted lines follow the file's convention).
+Patches that are already in place are detected and reported, so running a
+patch set twice is a no-op. A remove-block whose block is absent is
+reported as "no block" rather than "already applied": the block may have
+been removed by an earlier run, or its start/contains/end may not match.
+
+The exit status is 1 when a file named explicitly (not matched by a glob)
+has a patch that was not found, or when none of its patches matched at all.
+
+    python patch-html.py patches/map-fix.json [FILES...] [--dry-run]
+"""
+
+import argparse
+import difflib
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+PATCH_TYPES = ("insert-after", "remove-block", "replace-function-body")
+
+APPLIED = "applied"
+ALREADY = "already applied"
+NO_BLOCK = "no block found"
+MISSING = "not found"
+
+
+def load_patch_set(path):
+    with open(path, encoding="utf-8") as f:
+        patch_set = json.load(f)
+    for n, patch in enumerate(patch_set["patches"]):
+        if patch.get("type") not in PATCH_TYPES:
+            raise ValueError(f"{path}: patch {n} has unknown type {patch.get('type')!r}")
+    return patch_set
+
+
+def _strip_eol(line):
+    return line.rstrip("\r\n")
+
+
+def _braces(line):
+    return line.count("{") - line.count("}")
+
+
+def apply_patches(lines, patches):
+    """Apply every patch to `lines` in one pass.
+
+    `lines` keep their own line endings (read with newline=''). Returns the
+    new line list and one status per patch.
+
+    A remove-block candidate that turns out not to be the block, and a
+    function body once it is settled, are scanned again so the other
+    patches still see those lines.
+    """
+    lines = list(lines)
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    status = [MISSING] * len(patches)
+    out = []
+
+    skip = set()      # (patch index, line index) of remove-block candidates that fell through
+    block = None      # (patch index, first line index) while inside a remove-block candidate
+    function = None   # (patch index, brace depth, first body line index) inside a function
+    drop_blank = False
+    i = 0
+    while i < len(lines) or block is not None or function is not None:
+        if i == len(lines):
+            # The file ended inside a candidate: keep its lines and scan them for the other patches
+            if block is not None:
+                skip.add(block)
+                i, block = block[1], None
+            else:
+                i, function = function[2], None
+            continue
+        line = lines[i]
+        i += 1
+
+        if drop_blank:
+            drop_blank = False
+            if not line.strip():
+                continue
+
+        if function is not None:
+            k, depth, start = function
+            depth += _braces(line)
+            if depth > 0:
+                function = (k, depth, start)
+                continue
+            function = None
+            new_body = patches[k]["body"]
+            if [_strip_eol(b) for b in lines[start:i - 1]] == new_body:
+                status[k] = ALREADY
+            else:
+                status[k] = APPLIED
+                lines[start:i - 1] = [text + newline for text in new_body]
+            i = start
+            continue
+
+        if block is not None:
+            k, start = block
+            patch = patches[k]
+            if patch["start"] in line and patch["end"] not in line:
+                # A new candidate starts before the old one closed: the old one is not the block
+                skip.add(block)
+                i, block = start, None
+                continue
+            if patch["end"] not in line:
+                continue
+            block = None
+            if any(patch["contains"] in b for b in lines[start:i]):
+                status[k] = APPLIED
+                drop_blank = patch.get("blank_after", False)
+            else:
+                skip.add((k, start))
+                i = start
+            continue
+
+        handled = False
+        for k, patch in enumerate(patches):
+            kind = patch["type"]
+            if status[k] != MISSING:
+                continue
+            if kind == "remove-block" and patch["start"] in line and (k, i - 1) not in skip:
+                if patch["end"] in line and patch["start"] != patch["end"]:
+                    continue
+                block = (k, i - 1)
+                handled = True
+                break
+            if kind == "replace-function-body" and f"function {patch['name']}(" in line:
+                handled = True
+                depth = _braces(line)
+                if depth > 0:
+                    out.append(line)
+                    function = (k, depth, i)
+                    break
+                if depth < 0 or "{" not in line:
+                    out.append(line)
+                    break
+                # One-line function: split it into header, body and closing lines
+                head, rest = line.split("{", 1)
+                body, tail = rest.rsplit("}", 1)
+                if [body.strip()] == [text.strip() for text in patch["body"] if text.strip()]:
+                    status[k] = ALREADY
+                    out.append(line)
+                    break
+                indent = line[:len(line) - len(line.lstrip())]
+                split = [head + "{" + newline] + ([indent + "    " + body.strip() + newline] if body.strip() else [])
+                lines[i - 1:i] = split + [indent + "}" + tail]
+                i -= 1
+                break
+        if handled:
+            continue
+
+        out.append(line)
+        for k, patch in enumerate(patches):
+            if patch["type"] == "insert-after" and status[k] == MISSING and patch["anchor"] in line:
+                insert = patch["lines"]
+                following = [_strip_eol(l) for l in lines[i:i + len(insert)]]
+                if following == insert:
+                    status[k] = ALREADY
+                else:
+                    status[k] = APPLIED
+                    out.extend(text + newline for text in insert)
+
+    for k, patch in enumerate(patches):
+        # Either removed by an earlier run or a start/contains/end that never matches
+        if patch["type"] == "remove-block" and status[k] == MISSING:
+            status[k] = NO_BLOCK
+    return out, status
+
+
+def patch_file(job):
+    """Worker: patch one file. Returns a result dict (with a diff on dry runs)."""
+    path, patches, dry_run = job
+    start = time.perf_counter()
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        lines = f.readlines()
+    new_lines, status = apply_patches(lines, patches)
+    changed = new_lines != lines
+
+    diff = ""
+    if changed and dry_run:
+        diff = "".join(difflib.unified_diff(lines, new_lines, fromfile=path, tofile=path))
+    elif changed:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            f.writelines(new_lines)
+    return {
+        "path": path,
+        "changed": changed,
+        "status": status,
+        "diff": diff,
+        "ms": (time.perf_counter() - start) * 1000,
+    }
+
+
+def expand_files(patterns):
+    """Files matching `patterns`, plus the set of those named without a glob."""
+    files = []
+    explicit = set()
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern))
+        else:
+            matches = [pattern]
+            explicit.add(pattern)
+        files.extend(path for path in matches if path not in files)
+    return files, explicit
+
+
+def unmatched(status):
+    """True when patches are missing or nothing in the file matched at all."""
+    return MISSING in status or bool(status) and all(s in (MISSING, NO_BLOCK) for s in status)
+
+
+def run(patch_set, files, dry_run=False, workers=None):
+    patches = patch_set["patches"]
+    jobs = [(path, patches, dry_run) for path in files]
+    if len(jobs) <= 1:
+        return [patch_file(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(patch_file, jobs))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply a declarative patch set to HTML pages.")
+    parser.add_argument("patch_set", help="JSON patch set")
+    parser.add_argument("files", nargs="*", help="files or globs (default: the patch set's \"files\")")
+    parser.add_argument("--dry-run", action="store_true", help="print unified diffs instead of writing")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    patch_set = load_patch_set(args.patch_set)
+    files, explicit = expand_files(args.files or patch_set.get("files", ["pages/*.html"]))
+    missing = [path for path in files if not os.path.isfile(path)]
+    if missing:
+        print(f"❌ ERROR: no such file: {', '.join(missing)}")
+        return 1
+
+    start = time.perf_counter()
+    results = run(patch_set, files, args.dry_run, args.workers)
+    elapsed = time.perf_counter() - start
+
+    for result in results:
+        if result["diff"]:
+            print(result["diff"], end="")
+    print(f"{'file':<40} {'applied':>8} {'already':>8} {'no block':>8} {'missing':>8} {'ms':>8}")
+    for result in results:
+        counts = [result["status"].count(s) for s in (APPLIED, ALREADY, NO_BLOCK, MISSING)]
+        flag = "" if result["changed"] or not counts[0] else " (unchanged)"
+        print(f"{result['path']:<40} {counts[0]:>8} {counts[1]:>8} {counts[2]:>8} {counts[3]:>8} "
+              f"{result['ms']:>8.1f}{flag}")
+
+    failed = []
+    for result in results:
+        for k, status in enumerate(result["status"]):
+            if status in (NO_BLOCK, MISSING):
+                patch = patch_set["patches"][k]
+                print(f"⚠️  {result['path']}: patch {k} ({patch['type']}) {status}")
+        if result["path"] in explicit and unmatched(result["status"]):
+            failed.append(result["path"])
+
+    changed = sum(result["changed"] for result in results)
+    verb = "would change" if args.dry_run else "changed"
+    if failed:
+        print(f"\n❌ ERROR: patches not found in {', '.join(failed)}")
+        return 1
+    print(f"\n✅ {verb} {changed} of {len(results)} files in {elapsed * 1000:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
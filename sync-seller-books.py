@@ -0,0 +1,378 @@
+#!/usr/bin/env python3
+"""
+Delta sync of seller inventory into the chunked catalog
+
+js/browse-books.js used to select every row of the Supabase books table on
+each page load and concatenate it with the generated catalog, with no
+dedupe. This stage runs after generate-books.py --chunk-size N instead:
+
+  - seller rows are pulled from a pluggable source (Supabase REST, or a
+    local SQLite copy of the table for tests and offline runs), in pages,
+    and only rows past the stored high-water mark (created_at, id);
+  - each row is merged by ISBN through an on-disk SQLite index: a seller
+    listing replaces the catalog record with the same ISBN and title (the
+    generated editions share an ISBN), an updated row replaces its own
+    earlier listing, anything else is appended;
+  - only the chunks holding merged records are re-emitted, along with the
+    manifest, and seller-delta.json lists the seller records with their
+    catalog positions so the full-catalog path can patch
+    books-database.json without querying Supabase. The delta also records
+    the size of the generated catalog it applies to ("base"), so the
+    storefront can tell it belongs to a different build.
+
+Rows deleted upstream are not seen by a high-water mark; rebuild the
+catalog with generate-books.py to drop them. When the manifest no longer
+matches the one this script last wrote (the catalog was regenerated), the
+index is rebuilt from the chunks and every known seller row is re-applied.
+
+    python sync-seller-books.py --sqlite seller-books.db
+    SUPABASE_URL=... SUPABASE_KEY=... python sync-seller-books.py --supabase
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+import books_catalog
+
+SYNC_STATE = ".books-sync.db"
+DELTA_FILE = "seller-delta.json"
+PLACEHOLDER_COVER = "https://via.placeholder.com/400x600?text=Book"
+
+# Mirrors public.books in SUPABASE_MIGRATION_GUIDE.md, for the SQLite stand-in
+SELLER_TABLE = """
+CREATE TABLE IF NOT EXISTS {table} (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    author TEXT NOT NULL,
+    price REAL NOT NULL,
+    category TEXT NOT NULL,
+    condition TEXT NOT NULL,
+    stock TEXT NOT NULL,
+    gradient TEXT,
+    isbn TEXT,
+    cover TEXT,
+    created_at TEXT NOT NULL DEFAULT (strftime('%Y-%m-%dT%H:%M:%f+00:00', 'now'))
+)
+"""
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS catalog (position INTEGER PRIMARY KEY, isbn TEXT, title TEXT);
+CREATE INDEX IF NOT EXISTS catalog_key ON catalog (isbn, title);
+CREATE TABLE IF NOT EXISTS seller (id TEXT PRIMARY KEY, mark TEXT, position INTEGER, record TEXT);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+IDENTIFIER_RE = re.compile(r"[A-Za-z_]\w*")
+
+
+def _identifier(name):
+    if not IDENTIFIER_RE.fullmatch(name):
+        raise ValueError(f"not a plain column or table name: {name!r}")
+    return name
+
+
+class SqliteSource:
+    """Seller rows from a local SQLite copy of the Supabase books table."""
+
+    def __init__(self, path, table="books", column="created_at"):
+        self.table = _identifier(table)
+        self.column = _identifier(column)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute(SELLER_TABLE.format(table=self.table))
+
+    def fetch(self, after, limit):
+        """Up to `limit` rows ordered by (column, id), strictly after the `after` pair."""
+        where, params = "", ()
+        if after is not None:
+            where, params = f"WHERE ({self.column}, id) > (?, ?)", tuple(after)
+        rows = self.conn.execute(
+            f"SELECT * FROM {self.table} {where} ORDER BY {self.column}, id LIMIT ?", (*params, limit))
+        return [dict(row) for row in rows]
+
+    def close(self):
+        self.conn.close()
+
+
+class SupabaseSource:
+    """Seller rows from the Supabase REST API (PostgREST keyset pagination)."""
+
+    def __init__(self, url, key, table="books", column="created_at", timeout=30):
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/{_identifier(table)}"
+        self.column = _identifier(column)
+        self.headers = {"apikey": key, "Authorization": f"Bearer {key}", "Accept": "application/json"}
+        self.timeout = timeout
+
+    def fetch(self, after, limit):
+        params = {"select": "*", "order": f"{self.column}.asc,id.asc", "limit": str(limit)}
+        if after is not None:
+            mark, last_id = (json.dumps(str(value)) for value in after)
+            params["or"] = f"({self.column}.gt.{mark},and({self.column}.eq.{mark},id.gt.{last_id}))"
+        request = urllib.request.Request(f"{self.endpoint}?{urllib.parse.urlencode(params)}", headers=self.headers)
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    def close(self):
+        pass
+
+
+def iter_changes(source, watermark, batch_size):
+    """Yield pages of rows changed since `watermark`; each page ends with its new watermark."""
+    while True:
+        rows = source.fetch(watermark, batch_size)
+        if not rows:
+            return
+        watermark = [rows[-1][source.column], str(rows[-1]["id"])]
+        yield rows, watermark
+        if len(rows) < batch_size:
+            return
+
+
+def seller_record(row, normalize=True):
+    """Map a books-table row to a catalog record, with the defaults browse-books.js used."""
+    isbn = row.get("isbn") or ""
+    stock = row.get("stock")  # seller-add-book.js stores a quantity here
+    record = {
+        "title": row["title"],
+        "author": row["author"],
+        "price": round(float(row["price"]), 2),
+        "category": row["category"],
+        "condition": row["condition"],
+        "stock": stock if stock in books_catalog.STOCKS else "In Stock",
+        "gradient": row.get("gradient") or "sapiens",
+        "isbn": isbn,
+        "cover": row.get("cover") or (books_catalog.COVER_URL.format(isbn=isbn) if isbn else PLACEHOLDER_COVER),
+    }
+    if normalize:
+        # Seller prices are entered in rupees already; only the labels need the catalog's case
+        record["category"] = record["category"].upper()
+        record["condition"] = record["condition"].upper()
+    return record
+
+
+def read_chunk(directory, entry):
+    with open(os.path.join(directory, entry["file"]), encoding="utf-8") as f:
+        return json.load(f)["books"]
+
+
+def _remove_siblings(path):
+    for encoding in ("gz", "br"):
+        try:
+            os.remove(f"{path}.{encoding}")
+        except FileNotFoundError:
+            pass
+
+
+class SyncIndex:
+    """ISBN-keyed position index over the chunked catalog, kept in SQLite."""
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(INDEX_SCHEMA)
+
+    def get(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, key, value):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value)))
+
+    def rebuild(self, directory, manifest):
+        """Re-read the catalog positions from the chunks and queue every seller row again."""
+        self.conn.execute("DELETE FROM catalog")
+        position = 0
+        for entry in manifest["chunks"]:
+            books = read_chunk(directory, entry)
+            self.conn.executemany("INSERT INTO catalog VALUES (?, ?, ?)", (
+                (position + i, book["isbn"], book["title"]) for i, book in enumerate(books)))
+            position += len(books)
+        self.conn.execute("UPDATE seller SET position = NULL")
+        return {row_id: json.loads(record) for row_id, record in
+                self.conn.execute("SELECT id, record FROM seller ORDER BY mark, id")}
+
+    def upsert_seller(self, row_id, mark, record):
+        self.conn.execute(
+            "INSERT INTO seller (id, mark, record) VALUES (?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET mark = excluded.mark, record = excluded.record",
+            (row_id, mark, json.dumps(record, ensure_ascii=False)))
+
+    def place(self, row_id, record, total):
+        """Catalog position for a seller record; returns (position, new total)."""
+        row = self.conn.execute("SELECT position FROM seller WHERE id = ?", (row_id,)).fetchone()
+        position = row[0] if row else None
+        if position is None:
+            row = self.conn.execute("SELECT position FROM catalog WHERE isbn = ? AND title = ? LIMIT 1",
+                                    (record["isbn"], record["title"])).fetchone()
+            position = row[0] if row else None
+        if position is None:
+            position, total = total, total + 1
+        self.conn.execute("INSERT OR REPLACE INTO catalog VALUES (?, ?, ?)",
+                          (position, record["isbn"], record["title"]))
+        self.conn.execute("UPDATE seller SET position = ? WHERE id = ?", (position, row_id))
+        return position, total
+
+    def seller_records(self):
+        return [{"position": position, "book": json.loads(record)} for position, record in self.conn.execute(
+            "SELECT position, record FROM seller WHERE position IS NOT NULL ORDER BY position")]
+
+    def commit(self):
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+def sync(source, directory, state_path, batch_size=500, normalize=True):
+    """Merge changed seller rows into the chunks in `directory`; returns a stats dict."""
+    manifest_path = os.path.join(directory, books_catalog.ChunkWriter.MANIFEST)
+    with open(manifest_path, "rb") as f:
+        manifest_bytes = f.read()
+    manifest = json.loads(manifest_bytes)
+    chunk_size = manifest["chunkSize"]
+
+    index = SyncIndex(state_path)
+    pending = {}
+    rebuilt = index.get("manifest") != hashlib.sha256(manifest_bytes).hexdigest()
+    if rebuilt:
+        pending.update(index.rebuild(directory, manifest))
+        index.set("base", manifest["total"])
+
+    since = watermark = index.get("watermark")
+    fetched = pages = 0
+    for rows, watermark in iter_changes(source, watermark, batch_size):
+        pages += 1
+        fetched += len(rows)
+        for row in rows:
+            row_id = str(row["id"])
+            record = seller_record(row, normalize)
+            index.upsert_seller(row_id, str(row[source.column]), record)
+            pending.pop(row_id, None)
+            pending[row_id] = record
+
+    total = manifest["total"]
+    updates = {}
+    for row_id, record in pending.items():
+        position, total = index.place(row_id, record, total)
+        updates[position] = record
+
+    by_chunk = {}
+    for position in sorted(updates):
+        by_chunk.setdefault(position // chunk_size, []).append(position)
+
+    chunks = manifest["chunks"]
+    written = []
+    for number, positions in sorted(by_chunk.items()):
+        books = read_chunk(directory, chunks[number]) if number < len(chunks) else []
+        for position in positions:
+            offset = position - number * chunk_size
+            if offset < len(books):
+                books[offset] = updates[position]
+            else:
+                books.append(updates[position])
+        data, entry = books_catalog.ChunkWriter.encode_chunk(number, books)
+        path = os.path.join(directory, entry["file"])
+        if books_catalog.write_if_changed(path, data):
+            _remove_siblings(path)
+            written.append(entry["file"])
+        if number < len(chunks):
+            chunks[number] = entry
+        else:
+            chunks.append(entry)
+
+    manifest["total"] = total
+    if books_catalog.ChunkWriter.write_manifest(directory, manifest):
+        _remove_siblings(manifest_path)
+
+    delta_path = os.path.join(directory, DELTA_FILE)
+    delta_bytes = 0
+    if updates or rebuilt or not os.path.exists(delta_path):
+        delta = {"since": since, "watermark": watermark, "base": index.get("base"), "total": total,
+                 "changed": written, "books": index.seller_records()}
+        data = json.dumps(delta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        if books_catalog.write_if_changed(delta_path, data):
+            _remove_siblings(delta_path)
+            delta_bytes = len(data)
+
+    # Record the manifest just written so the next run can tell our edits from a regenerated catalog
+    with open(manifest_path, "rb") as f:
+        index.set("manifest", hashlib.sha256(f.read()).hexdigest())
+    index.set("watermark", watermark)
+    index.commit()
+    index.close()
+    return {
+        "rebuilt": rebuilt,
+        "pages": pages,
+        "fetched": fetched,
+        "merged": len(updates),
+        "chunks": written,
+        "total": total,
+        "watermark": watermark,
+        "delta": delta_path,
+        "delta_bytes": delta_bytes,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge changed seller books into the chunked catalog.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--sqlite", metavar="PATH", help="SQLite stand-in for the Supabase books table")
+    source.add_argument("--supabase", action="store_true",
+                        help="read from Supabase REST (SUPABASE_URL and SUPABASE_KEY from the environment)")
+    parser.add_argument("--table", default="books", help="seller books table (default: books)")
+    parser.add_argument("--watermark-column", default="created_at",
+                        help="monotonic column for the high-water mark (an updated_at column also catches edits)")
+    parser.add_argument("--chunk-dir", default="books-chunks", help="chunk directory written by generate-books.py")
+    parser.add_argument("--state", default=SYNC_STATE, help=f"on-disk ISBN index and watermark (default: {SYNC_STATE})")
+    parser.add_argument("--batch-size", type=int, default=500, help="rows per page read from the source")
+    parser.add_argument("--no-normalize", dest="normalize", action="store_false",
+                        help="keep the seller's category/condition case")
+    parser.add_argument("--compress", action="store_true", help="refresh .gz/.br siblings of the chunk directory")
+    args = parser.parse_args(argv)
+
+    if not os.path.isfile(os.path.join(args.chunk_dir, books_catalog.ChunkWriter.MANIFEST)):
+        print(f"❌ ERROR: no manifest in {args.chunk_dir}; run generate-books.py --chunk-size 24 first")
+        return 1
+    if args.supabase:
+        url, key = os.environ.get("SUPABASE_URL"), os.environ.get("SUPABASE_KEY")
+        if not url or not key:
+            print("❌ ERROR: --supabase needs SUPABASE_URL and SUPABASE_KEY")
+            return 1
+        source = SupabaseSource(url, key, args.table, args.watermark_column)
+    else:
+        source = SqliteSource(args.sqlite, args.table, args.watermark_column)
+
+    start = time.perf_counter()
+    try:
+        stats = sync(source, args.chunk_dir, args.state, args.batch_size, args.normalize)
+    finally:
+        source.close()
+    elapsed = time.perf_counter() - start
+
+    if stats["rebuilt"]:
+        print("✓ Catalog changed since the last sync; index rebuilt and seller rows re-applied")
+    print(f"✓ Fetched {stats['fetched']} changed rows in {stats['pages']} pages "
+          f"(watermark {stats['watermark'] and stats['watermark'][0]})")
+    print(f"✓ Merged {stats['merged']} records, rewrote {len(stats['chunks'])} chunks, "
+          f"catalog now {stats['total']} records")
+    if stats["delta_bytes"]:
+        print(f"✓ {stats['delta']} {stats['delta_bytes'] / 1024:.2f} KB written")
+    print(f"✓ Synced in {elapsed * 1000:.1f} ms")
+
+    if args.compress:
+        files = [os.path.join(args.chunk_dir, name) for name in sorted(os.listdir(args.chunk_dir))
+                 if name.endswith(".json")]
+        groups = [(f"{args.chunk_dir}/ ({len(files)} files)", files)]
+        books_catalog.print_compression_report(*books_catalog.compress_outputs(groups, os.path.dirname(args.state)))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
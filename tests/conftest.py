@@ -0,0 +1,23 @@
+"""
+Shared test helpers
+
+The catalog tools are scripts with hyphenated names, so tests load them by
+path with load_script(); books_catalog is importable from the repo root.
+"""
+
+import importlib.util
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def load_script(name):
+    """Import ROOT/<name>.py, e.g. load_script("sync-seller-books")."""
+    spec = importlib.util.spec_from_file_location(name.replace("-", "_"), os.path.join(ROOT, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module  # so worker pools can pickle the script's functions
+    spec.loader.exec_module(module)
+    return module
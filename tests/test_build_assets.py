@@ -0,0 +1,94 @@
+import glob
+import os
+import shutil
+import subprocess
+
+import pytest
+from conftest import ROOT, load_script
+
+build_assets = load_script("build-assets")
+
+NODE = shutil.which("node")
+
+
+@pytest.mark.parametrize("src, expected", [
+    ("let a = 1 // note\nlet b = 2\n", "let a = 1\nlet b = 2\n"),
+    ('var s = "a // b /* c */";  /* x */ var t = 1;', 'var s = "a // b /* c */"; var t = 1;\n'),
+    ("const r = /\\/\\*[a-z]+/g.test(x)", "const r = /\\/\\*[a-z]+/g.test(x)\n"),
+    ("let z = a / b / c // d", "let z = a / b / c\n"),
+    ("if (x) { return /re/ }", "if (x) { return /re/ }\n"),
+    ('const t = `x ${ {a: "}"}.a } // y`;\n', 'const t = `x ${ {a: "}"}.a } // y`;\n'),
+    ("x = y ++ + z", "x = y ++ + z\n"),
+])
+def test_minify_js_drops_comments_but_not_strings_regexes_or_templates(src, expected):
+    assert build_assets.minify_js(src) == expected
+
+
+def test_minify_js_keeps_the_newlines_semicolon_insertion_needs():
+    assert build_assets.minify_js("function f() {\n  return\n    value\n}\n") == "function f() {\nreturn\nvalue\n}\n"
+    assert build_assets.minify_js("a = b\n\n\n(c)\n") == "a = b\n(c)\n"
+
+
+def test_minify_css_drops_comments_whitespace_and_last_semicolons():
+    src = 'a { color : red ;  }\n/* note */ b , i { content: "x ;  }" ; margin: 0 }\n'
+    assert build_assets.minify_css(src) == 'a{color : red}b,i{content: "x ;  }";margin: 0}\n'
+
+
+def test_rebase_css_urls_points_at_the_same_files_from_assets():
+    css = 'a{background:url("img/x.png")} b{background:url(data:x)} c{background:url(/abs.png)}'
+    assert build_assets.rebase_css_urls(css, "css/main.css", "assets") == \
+        'a{background:url("../css/img/x.png")} b{background:url(data:x)} c{background:url(/abs.png)}'
+
+
+def test_bundle_name_changes_with_contents_only():
+    files = ["js/a.js", "js/b.js"]
+    name = build_assets.bundle_name("js", files, {"js/a.js": "1", "js/b.js": "2"})
+    assert name.startswith("bundle.") and name.endswith(".js")
+    assert build_assets.bundle_name("js", files, {"js/a.js": "1", "js/b.js": "2"}) == name
+    assert build_assets.bundle_name("js", files, {"js/a.js": "1", "js/b.js": "3"}) != name
+    assert build_assets.bundle_name("js", files[:1], {"js/a.js": "1"}).startswith("a.")
+
+
+@pytest.mark.skipif(NODE is None, reason="node is not installed")
+def test_minified_site_scripts_still_parse(tmp_path):
+    sources = sorted(glob.glob(os.path.join(ROOT, "js", "*.js")))
+    for path in sources:
+        with open(path, encoding="utf-8") as f:
+            src = f.read()
+        if subprocess.run([NODE, "--check", path], capture_output=True).returncode:
+            continue  # already broken upstream; build-assets leaves these out of bundles
+        out = tmp_path / os.path.basename(path)
+        out.write_text(build_assets.minify_js(src), encoding="utf-8")
+        result = subprocess.run([NODE, "--check", str(out)], capture_output=True, text=True)
+        assert result.returncode == 0, f"{os.path.basename(path)}: {result.stderr}"
+        assert len(out.read_text(encoding="utf-8")) <= len(src)
+
+
+def test_site_stylesheets_shrink_without_comments():
+    for path in sorted(glob.glob(os.path.join(ROOT, "css", "*.css"))):
+        with open(path, encoding="utf-8") as f:
+            src = f.read()
+        css = build_assets.minify_css(src)
+        assert len(css) <= len(src)
+        assert not any(token.startswith("/*") for token in build_assets.CSS_TOKEN_RE.findall(css))
+
+
+def test_build_bundles_a_page_and_skips_it_when_unchanged(tmp_path, capsys):
+    root = tmp_path / "site"
+    (root / "js").mkdir(parents=True)
+    (root / "js" / "a.js").write_text("var a = 1 // one\n", encoding="utf-8")
+    (root / "js" / "b.js").write_text("var b = a + 1\n", encoding="utf-8")
+    (root / "page.html").write_text(
+        '<html>\r\n  <script src="js/a.js"></script>\r\n  <script src="js/b.js"></script>\r\n</html>\r\n',
+        encoding="utf-8", newline="")
+    out = tmp_path / "dist"
+
+    assert build_assets.main(["page.html", "--root", str(root), "--out", str(out)]) == 0
+    page = (out / "page.html").read_bytes().decode("utf-8")
+    [bundle] = os.listdir(out / "assets")
+    assert page == f'<html>\r\n  <script src="assets/{bundle}"></script>\r\n</html>\r\n'
+    assert (out / "assets" / bundle).read_text(encoding="utf-8") == "var a = 1\n;\nvar b = a + 1\n"
+
+    capsys.readouterr()
+    assert build_assets.main(["page.html", "--root", str(root), "--out", str(out)]) == 0
+    assert "(unchanged)" in capsys.readouterr().out
@@ -0,0 +1,88 @@
+import json
+import os
+
+import pytest
+from conftest import load_script
+
+import books_catalog
+
+generate = load_script("generate-books")
+
+COUNT = 200  # each books_data entry feeds records i, i + 97 and i + 194
+CHUNK_SIZE = 24
+
+
+@pytest.fixture
+def build(tmp_path):
+    def run():
+        assert generate.main([
+            "--count", str(COUNT), "--seed", "7", "--incremental", "--formats", "pretty,ndjson",
+            "--chunk-size", str(CHUNK_SIZE), "--output", str(tmp_path / "books-database.json"),
+            "--chunk-dir", str(tmp_path / "books-chunks"),
+        ]) == 0
+    return run
+
+
+def chunk_mtimes(tmp_path):
+    directory = tmp_path / "books-chunks"
+    return {name: os.stat(directory / name).st_mtime_ns for name in os.listdir(directory)}
+
+
+def read_chunk(tmp_path, name):
+    with open(tmp_path / "books-chunks" / name, encoding="utf-8") as f:
+        return json.load(f)["books"]
+
+
+def test_first_build_matches_a_full_one(build, tmp_path):
+    build()
+
+    with open(tmp_path / "books-database.json", encoding="utf-8") as f:
+        books = json.load(f)["books"]
+    assert books == list(books_catalog.iter_books(COUNT, seed=7, normalize=True))
+    with open(tmp_path / "books-chunks" / books_catalog.ChunkWriter.MANIFEST, encoding="utf-8") as f:
+        manifest = json.load(f)
+    assert manifest["total"] == COUNT and len(manifest["chunks"]) == -(-COUNT // CHUNK_SIZE)
+    assert [book for entry in manifest["chunks"] for book in read_chunk(tmp_path, entry["file"])] == books
+
+
+def test_unchanged_rebuild_is_a_no_op(build, tmp_path, capsys):
+    build()
+    before = chunk_mtimes(tmp_path)
+    capsys.readouterr()
+
+    build()
+
+    assert "Catalog up to date" in capsys.readouterr().out
+    assert chunk_mtimes(tmp_path) == before
+
+
+def test_edited_entry_rewrites_only_the_chunks_holding_its_records(build, tmp_path, monkeypatch, capsys):
+    build()
+    before = chunk_mtimes(tmp_path)
+    edited = list(books_catalog.books_data)
+    edited[3] = dict(edited[3], title="A Retitled Classic")
+    monkeypatch.setattr(books_catalog, "books_data", edited)
+    monkeypatch.setattr(generate, "books_data", edited)
+    capsys.readouterr()
+
+    build()
+
+    assert "3 of 200 records changed" in capsys.readouterr().out
+    after = chunk_mtimes(tmp_path)
+    rewritten = {name for name in after if after[name] != before.get(name)}
+    dirty = {f"books-page-{n + 1:05d}.json" for n in (3 // CHUNK_SIZE, 100 // CHUNK_SIZE, 197 // CHUNK_SIZE)}
+    assert rewritten == dirty | {books_catalog.ChunkWriter.MANIFEST}
+    assert read_chunk(tmp_path, "books-page-00001.json")[3]["title"] == "A Retitled Classic"
+
+
+def test_chunk_changed_on_disk_is_regenerated(build, tmp_path):
+    build()
+    path = tmp_path / "books-chunks" / "books-page-00002.json"
+    original = path.read_bytes()
+    books = read_chunk(tmp_path, "books-page-00002.json")
+    books[0]["title"] = "Patched by a seller sync"
+    path.write_text(json.dumps({"books": books}), encoding="utf-8")
+
+    build()
+
+    assert path.read_bytes() == original
@@ -0,0 +1,126 @@
+import json
+
+from conftest import load_script
+
+patch_html = load_script("patch-html")
+
+PAGE = """<html>
+<head>
+  <script src="js/main.js"></script>
+</head>
+<body>
+  <div id="map-modal">
+    <p>Pick a location</p>
+  </div>
+
+  <div id="footer"></div>
+  <script>
+    function openAddAddressMode() {
+      if (ready) {
+        showMap();
+      }
+    }
+  </script>
+</body>
+</html>
+"""
+
+INSERT = {"type": "insert-after", "anchor": "js/main.js", "lines": ['  <script src="js/map-fix.js"></script>']}
+REMOVE = {"type": "remove-block", "start": "<div id=", "contains": "Pick a location", "end": "</div>",
+          "blank_after": True}
+REPLACE = {"type": "replace-function-body", "name": "openAddAddressMode",
+           "body": ["      openMapFix();"]}
+
+
+def lines_of(text):
+    return text.splitlines(keepends=True)
+
+
+def apply(text, *patches):
+    out, status = patch_html.apply_patches(lines_of(text), list(patches))
+    return "".join(out), status
+
+
+def test_patches_apply_once_and_are_detected_on_the_second_run():
+    patched, status = apply(PAGE, INSERT, REMOVE, REPLACE)
+
+    assert status == [patch_html.APPLIED] * 3
+    assert '<script src="js/main.js"></script>\n  <script src="js/map-fix.js"></script>\n' in patched
+    assert "map-modal" not in patched and "Pick a location" not in patched
+    assert "\n\n  <div id=\"footer\">" not in patched  # the blank line after the block went with it
+    assert "function openAddAddressMode() {\n      openMapFix();\n    }\n" in patched
+
+    again, status = apply(patched, INSERT, REMOVE, REPLACE)
+    assert again == patched
+    assert status == [patch_html.ALREADY, patch_html.NO_BLOCK, patch_html.ALREADY]
+
+
+def test_candidate_without_the_marker_stays_visible_to_other_patches():
+    # <div id="footer"> starts a remove-block candidate; it does not contain the marker,
+    # so its lines must still be scanned for the insert-after anchor inside it.
+    page = '<div id="footer">\n  <span>anchor</span>\n</div>\n<div id="map">\n  Pick a location\n</div>\n'
+    insert = {"type": "insert-after", "anchor": "anchor", "lines": ["  <b>new</b>"]}
+
+    patched, status = apply(page, REMOVE, insert)
+
+    assert status == [patch_html.APPLIED, patch_html.APPLIED]
+    assert patched == '<div id="footer">\n  <span>anchor</span>\n  <b>new</b>\n</div>\n'
+
+
+def test_candidate_restarted_by_a_nested_start_removes_only_the_inner_block():
+    page = '<div id="outer">\n<div id="map">\nPick a location\n</div>\n</div>\n'
+
+    patched, status = apply(page, REMOVE)
+
+    assert status == [patch_html.APPLIED]
+    assert patched == '<div id="outer">\n</div>\n'
+
+
+def test_candidate_left_open_at_end_of_file_is_kept():
+    page = '<div id="map">\nPick a location\n<span>anchor</span>\n'
+    insert = {"type": "insert-after", "anchor": "anchor", "lines": ["<b>new</b>"]}
+
+    patched, status = apply(page, REMOVE, insert)
+
+    assert status == [patch_html.NO_BLOCK, patch_html.APPLIED]
+    assert patched == page + "<b>new</b>\n"
+
+
+def test_one_line_function_is_split_and_replaced():
+    page = "<script>\n  function openAddAddressMode() { showMap(); }\n</script>\n"
+
+    patched, status = apply(page, REPLACE)
+
+    assert status == [patch_html.APPLIED]
+    assert patched == "<script>\n  function openAddAddressMode() {\n      openMapFix();\n  }\n</script>\n"
+    assert apply(patched, REPLACE) == (patched, [patch_html.ALREADY])
+
+
+def test_crlf_files_stay_crlf():
+    page = PAGE.replace("\n", "\r\n")
+
+    patched, status = apply(page, INSERT, REMOVE, REPLACE)
+
+    assert status == [patch_html.APPLIED] * 3
+    assert "\n" not in patched.replace("\r\n", "")
+
+
+def test_explicit_file_with_a_missing_patch_fails(tmp_path, capsys):
+    page = tmp_path / "page.html"
+    page.write_text("<html></html>\n", encoding="utf-8")
+    patch_set = tmp_path / "patches.json"
+    patch_set.write_text(json.dumps({"patches": [INSERT]}), encoding="utf-8")
+
+    assert patch_html.main([str(patch_set), str(page)]) == 1
+    assert page.read_text(encoding="utf-8") == "<html></html>\n"
+    assert "patches not found" in capsys.readouterr().out
+
+
+def test_globbed_files_without_matches_do_not_fail(tmp_path):
+    (tmp_path / "a.html").write_text(PAGE, encoding="utf-8")
+    (tmp_path / "b.html").write_text("<html></html>\n", encoding="utf-8")
+    patch_set = tmp_path / "patches.json"
+    patch_set.write_text(json.dumps({"patches": [INSERT]}), encoding="utf-8")
+
+    assert patch_html.main([str(patch_set), str(tmp_path / "*.html"), "--workers", "1"]) == 0
+    assert "js/map-fix.js" in (tmp_path / "a.html").read_text(encoding="utf-8")
@@ -0,0 +1,135 @@
+import json
+import os
+
+import pytest
+from conftest import load_script
+
+import books_catalog
+
+sync_books = load_script("sync-seller-books")
+
+COUNT = 60
+CHUNK_SIZE = 24
+
+
+def write_catalog(directory, seed=1):
+    writer = books_catalog.ChunkWriter(str(directory), CHUNK_SIZE)
+    for book in books_catalog.iter_books(COUNT, seed=seed, normalize=True):
+        writer.add(book)
+    writer.close()
+    return writer.manifest
+
+
+def read_books(directory):
+    with open(os.path.join(directory, books_catalog.ChunkWriter.MANIFEST), encoding="utf-8") as f:
+        manifest = json.load(f)
+    books = []
+    for entry in manifest["chunks"]:
+        books += sync_books.read_chunk(str(directory), entry)
+    return manifest, books
+
+
+def read_delta(directory):
+    with open(os.path.join(directory, sync_books.DELTA_FILE), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def seller_row(row_id, title, isbn, price=499.0, created_at="2026-01-01T00:00:00+00:00", **extra):
+    row = {"id": row_id, "title": title, "author": "Seller", "price": price, "category": "Fiction",
+           "condition": "Used", "stock": "In Stock", "gradient": None, "isbn": isbn, "cover": None,
+           "created_at": created_at}
+    row.update(extra)
+    return row
+
+
+@pytest.fixture
+def chunks(tmp_path):
+    directory = tmp_path / "books-chunks"
+    write_catalog(directory)
+    return directory
+
+
+@pytest.fixture
+def seller(tmp_path):
+    """A SQLite stand-in for the Supabase books table, with an insert(row) helper."""
+    source = sync_books.SqliteSource(str(tmp_path / "seller.db"))
+
+    def insert(row):
+        columns = ", ".join(row)
+        source.conn.execute(f"INSERT OR REPLACE INTO books ({columns}) VALUES ({', '.join('?' * len(row))})",
+                            tuple(row.values()))
+        source.conn.commit()
+
+    source.insert = insert
+    yield source
+    source.close()
+
+
+def run_sync(seller, chunks, tmp_path, **kwargs):
+    return sync_books.sync(seller, str(chunks), str(tmp_path / sync_books.SYNC_STATE), **kwargs)
+
+
+def test_listing_replaces_the_record_with_its_isbn_and_title(seller, chunks, tmp_path):
+    _, books = read_books(chunks)
+    target = books[30]
+    seller.insert(seller_row("a", target["title"], target["isbn"]))
+
+    stats = run_sync(seller, chunks, tmp_path)
+
+    manifest, merged = read_books(chunks)
+    assert stats["merged"] == 1 and stats["chunks"] == ["books-page-00002.json"]
+    assert manifest["total"] == COUNT
+    assert merged[30] == sync_books.seller_record(seller_row("a", target["title"], target["isbn"]))
+    assert merged[:30] + merged[31:] == books[:30] + books[31:]
+
+
+def test_unknown_listing_is_appended_and_listed_in_the_delta(seller, chunks, tmp_path):
+    seller.insert(seller_row("new", "A Seller Original", "9780306406157"))
+
+    stats = run_sync(seller, chunks, tmp_path)
+
+    manifest, merged = read_books(chunks)
+    assert stats["total"] == manifest["total"] == COUNT + 1
+    assert merged[COUNT]["title"] == "A Seller Original"
+    assert sum(entry["count"] for entry in manifest["chunks"]) == COUNT + 1
+    delta = read_delta(chunks)
+    assert delta["base"] == COUNT and delta["total"] == COUNT + 1
+    assert [entry["position"] for entry in delta["books"]] == [COUNT]
+
+
+def test_second_sync_without_changes_writes_nothing(seller, chunks, tmp_path):
+    seller.insert(seller_row("new", "A Seller Original", "9780306406157"))
+    run_sync(seller, chunks, tmp_path)
+    before = {name: os.stat(chunks / name).st_mtime_ns for name in os.listdir(chunks)}
+
+    stats = run_sync(seller, chunks, tmp_path)
+
+    assert not stats["rebuilt"] and stats["fetched"] == 0 and stats["merged"] == 0
+    assert {name: os.stat(chunks / name).st_mtime_ns for name in os.listdir(chunks)} == before
+
+
+def test_updated_row_replaces_its_own_listing(seller, chunks, tmp_path):
+    seller.insert(seller_row("new", "A Seller Original", "9780306406157", price=300.0))
+    run_sync(seller, chunks, tmp_path)
+    seller.insert(seller_row("new", "A Seller Original", "9780306406157", price=250.0,
+                             created_at="2026-01-02T00:00:00+00:00"))
+
+    stats = run_sync(seller, chunks, tmp_path)
+
+    manifest, merged = read_books(chunks)
+    assert stats["fetched"] == 1 and manifest["total"] == COUNT + 1
+    assert merged[COUNT]["price"] == 250.0
+
+
+def test_regenerated_catalog_gets_the_listings_again(seller, chunks, tmp_path):
+    _, books = read_books(chunks)
+    seller.insert(seller_row("a", books[5]["title"], books[5]["isbn"]))
+    run_sync(seller, chunks, tmp_path)
+
+    write_catalog(chunks)  # a fresh generator run overwrites the merged chunk
+    stats = run_sync(seller, chunks, tmp_path)
+
+    _, merged = read_books(chunks)
+    assert stats["rebuilt"] and stats["fetched"] == 0
+    assert merged[5]["author"] == "Seller"
+    assert read_delta(chunks)["base"] == COUNT
@@ -0,0 +1,408 @@
+#!/usr/bin/env python3
+"""
+Streaming validator for every catalog artifact generate-books.py emits
+
+Replaces validate-books.js, which eval'd books-data.js and only looked at
+title, author and price. Records are streamed one at a time from:
+
+  - books-database.json ({"books": [...]}), books-array.js, first100books.json
+  - books-data.js (const booksData = [...];)
+  - NDJSON
+  - a chunk directory or its manifest.json (checksums are verified too)
+  - the columnar .ssc catalog
+
+and checked for the full schema, ISBN-13 checksums, category/condition/
+stock/gradient enums, price range, duplicate ISBN+title pairs and covers
+that point at a different ISBN. Prices must fall in the generator's range
+(or --price-range); seller listings that sync-seller-books.py merged into
+a chunk directory, as listed in its seller-delta.json, only need a
+positive price. Memory stays bounded: besides a few error samples only an
+8-byte hash per record is kept for duplicate detection. Chunked, NDJSON
+and columnar inputs can be split across worker processes.
+
+    python validate-catalog.py books-database.json [--workers 4] [--report report.json]
+    python validate-catalog.py books-chunks/ --price-range 1-100000
+
+Exits non-zero when any check fails, so it can gate a build.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import books_catalog
+
+CATEGORIES = {entry["category"] for entry in books_catalog.books_data}
+ENUMS = {
+    "category": CATEGORIES | {c.upper() for c in CATEGORIES},
+    "condition": set(books_catalog.CONDITIONS) | {c.upper() for c in books_catalog.CONDITIONS},
+    "stock": set(books_catalog.STOCKS),
+    "gradient": set(books_catalog.GRADIENTS),
+}
+PRICE_RANGES = {
+    "usd": books_catalog.PRICE_RANGE,
+    "inr": tuple(round(p * books_catalog.INR_PER_USD, 2) for p in books_catalog.PRICE_RANGE),
+}
+DELTA_FILE = "seller-delta.json"  # written into the chunk directory by sync-seller-books.py
+COVER_PREFIX = books_catalog.COVER_URL.split("{")[0]
+FIELD_KEYS = set(books_catalog.FIELDS)
+READ_BLOCK = 1 << 20
+SEPARATORS = re.compile(r"[\s,]*")
+
+
+@lru_cache(maxsize=65536)
+def isbn13_ok(isbn):
+    if len(isbn) != 13 or not isbn.isdigit():
+        return False
+    total = sum((3 if k % 2 else 1) * int(digit) for k, digit in enumerate(isbn[:12]))
+    return (10 - total % 10) % 10 == int(isbn[12])
+
+
+@lru_cache(maxsize=65536)
+def expected_cover(isbn):
+    return books_catalog.COVER_URL.format(isbn=isbn)
+
+
+def parse_price_range(text):
+    low, _, high = text.partition("-")
+    try:
+        price_range = float(low), float(high)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected LOW-HIGH, got {text!r}") from None
+    if price_range[0] > price_range[1]:
+        raise argparse.ArgumentTypeError(f"empty price range {text!r}")
+    return price_range
+
+
+def seller_records(directory):
+    """Records sync-seller-books.py merged into a chunk directory, by position."""
+    try:
+        with open(os.path.join(directory, DELTA_FILE), encoding="utf-8") as f:
+            delta = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return {entry["position"]: entry["book"] for entry in delta.get("books", [])}
+
+
+def pair_digest(book):
+    key = f"{book.get('isbn')}\0{book.get('title')}".encode("utf-8")
+    return hashlib.blake2b(key, digest_size=8).digest()
+
+
+class Checker:
+    """Accumulates check failures for a run of records."""
+
+    def __init__(self, currency="auto", max_samples=20, price_range=None, sellers=None):
+        self.currency = currency
+        self.max_samples = max_samples
+        self.price_range = price_range
+        self.sellers = sellers or {}  # position -> seller record, exempt from the generated price range
+        self.records = 0
+        self.errors = {}
+        self.samples = []
+        self.digests = bytearray()  # 8-byte ISBN+title hash per record
+
+    def fail(self, i, check, message):
+        self.errors[check] = self.errors.get(check, 0) + 1
+        if len(self.samples) < self.max_samples:
+            self.samples.append({"record": i, "check": check, "message": message})
+
+    def check(self, i, book):
+        self.records += 1
+        if type(book) is not dict:
+            self.fail(i, "schema", f"expected an object, got {type(book).__name__}")
+            return
+        self.digests += pair_digest(book)
+
+        if book.keys() != FIELD_KEYS:
+            missing = [field for field in books_catalog.FIELDS if field not in book]
+            extra = sorted(set(book).difference(books_catalog.FIELDS))
+            self.fail(i, "schema", f"missing {missing} / unexpected {extra}")
+        get = book.get
+        for field in ("title", "author"):
+            if type(get(field)) is not str:
+                self.fail(i, "schema", f"{field} is {type(get(field)).__name__}, expected str")
+
+        for field, allowed in ENUMS.items():
+            value = get(field)
+            if type(value) is not str or value not in allowed:
+                self.fail(i, f"enum:{field}", f"{field} {value!r} is not allowed")
+
+        price = get("price")
+        if type(price) is not float and type(price) is not int:
+            self.fail(i, "price", f"price {price!r} is not a number")
+        elif self.sellers.get(i) == book:
+            if price <= 0:
+                self.fail(i, "price", f"seller price {price} is not positive")
+        else:
+            currency = self.currency
+            if currency == "auto":
+                category = get("category")
+                currency = "inr" if type(category) is str and category.isupper() else "usd"
+            low, high = self.price_range or PRICE_RANGES[currency]
+            if not low <= price <= high:
+                self.fail(i, "price", f"price {price} outside {low}-{high} {currency.upper()}")
+
+        isbn = get("isbn")
+        if type(isbn) is not str:
+            self.fail(i, "schema", f"isbn is {type(isbn).__name__}, expected str")
+            return
+        if not isbn13_ok(isbn):
+            self.fail(i, "isbn", f"ISBN {isbn!r} fails the ISBN-13 checksum")
+        cover = get("cover")
+        if type(cover) is not str:
+            self.fail(i, "schema", f"cover is {type(cover).__name__}, expected str")
+        elif cover != expected_cover(isbn) and cover.startswith(COVER_PREFIX):
+            self.fail(i, "cover", f"cover {cover!r} does not match ISBN {isbn}")
+
+    def merge(self, other):
+        self.records += other.records
+        for check, count in other.errors.items():
+            self.errors[check] = self.errors.get(check, 0) + count
+        room = self.max_samples - len(self.samples)
+        self.samples.extend(other.samples[:max(room, 0)])
+        self.digests += other.digests
+
+
+# ---------------------------------------------------------------- readers
+
+def iter_json_array(path):
+    """Yield objects of the first JSON array in the file without loading it whole.
+
+    Works for {"books": [...]}, bare arrays and the booksData JS global,
+    since in all of them the first "[" opens the record array.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8-sig") as f:
+        buf = ""
+        while "[" not in buf:
+            block = f.read(READ_BLOCK)
+            if not block:
+                raise ValueError(f"{path}: no JSON array found")
+            buf += block
+        pos = buf.index("[") + 1
+        eof = False
+        while True:
+            pos = SEPARATORS.match(buf, pos).end()
+            if pos >= len(buf):
+                if eof:
+                    raise ValueError(f"{path}: unterminated array")
+                block = f.read(READ_BLOCK)
+                eof = not block
+                buf, pos = buf[pos:] + block, 0
+                continue
+            if buf[pos] == "]":
+                return
+            try:
+                obj, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                block = f.read(READ_BLOCK)
+                eof = not block
+                buf, pos = buf[pos:] + block, 0
+                continue
+            yield obj
+            pos = end
+
+
+def iter_ndjson(path, start=0, stop=None):
+    """Yield records from the lines that begin inside byte range [start, stop)."""
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # finish the line that straddles `start`
+        while stop is None or f.tell() < stop:
+            line = f.readline()
+            if not line:
+                break
+            if line.strip():
+                yield json.loads(line)
+
+
+def ndjson_segments(path, parts):
+    size = os.path.getsize(path)
+    step = max(1, -(-size // parts))
+    return [(start, min(start + step, size)) for start in range(0, size, step)]
+
+
+def detect_format(path):
+    if os.path.isdir(path) or os.path.basename(path) == books_catalog.ChunkWriter.MANIFEST:
+        return "chunks"
+    with open(path, "rb") as f:
+        head = f.read(len(books_catalog.COLUMNAR_MAGIC))
+    if head == books_catalog.COLUMNAR_MAGIC:
+        return "columnar"
+    if path.endswith((".ndjson", ".jsonl")):
+        return "ndjson"
+    return "json"
+
+
+# ---------------------------------------------------------------- workers
+
+def _validate_segment(job):
+    """Worker: validate one slice of the input; record numbers are global."""
+    fmt, path, segment, base, currency, price_range, sellers = job
+    checker = Checker(currency, price_range=price_range, sellers=sellers)
+    if fmt == "chunks":
+        directory = path
+        for name, expected_sha, expected_count in segment:
+            with open(os.path.join(directory, name), "rb") as f:
+                data = f.read()
+            if hashlib.sha256(data).hexdigest() != expected_sha:
+                checker.fail(base, "checksum", f"{name} does not match its manifest checksum")
+            books = json.loads(data)["books"]
+            if len(books) != expected_count:
+                checker.fail(base, "checksum", f"{name} has {len(books)} records, manifest says {expected_count}")
+            for offset, book in enumerate(books):
+                checker.check(base + offset, book)
+            base += len(books)
+    elif fmt == "ndjson":
+        start, stop = segment
+        for offset, book in enumerate(iter_ndjson(path, start, stop)):
+            checker.check(offset, book)  # renumbered by the caller
+    elif fmt == "columnar":
+        start, stop = segment
+        with books_catalog.ColumnarCatalog(path) as catalog:
+            for i in range(start, stop):
+                checker.check(i, catalog[i])
+    return checker
+
+
+def plan(fmt, path, parts, currency, price_range=None):
+    """Split the input into worker jobs."""
+    if fmt == "chunks":
+        directory = path if os.path.isdir(path) else os.path.dirname(path)
+        with open(os.path.join(directory, books_catalog.ChunkWriter.MANIFEST), encoding="utf-8") as f:
+            chunks = json.load(f)["chunks"]
+        sellers = seller_records(directory)
+        jobs, base = [], 0
+        step = max(1, -(-len(chunks) // parts))
+        for k in range(0, len(chunks), step):
+            group = [(c["file"], c["sha256"], c["count"]) for c in chunks[k:k + step]]
+            end = base + sum(count for _, _, count in group)
+            group_sellers = {i: book for i, book in sellers.items() if base <= i < end}
+            jobs.append((fmt, directory, group, base, currency, price_range, group_sellers))
+            base = end
+        return jobs
+    if fmt == "ndjson":
+        return [(fmt, path, segment, 0, currency, price_range, None) for segment in ndjson_segments(path, parts)]
+    if fmt == "columnar":
+        with books_catalog.ColumnarCatalog(path) as catalog:
+            count = len(catalog)
+        step = max(1, -(-count // parts))
+        return [(fmt, path, (start, min(start + step, count)), start, currency, price_range, None)
+                for start in range(0, count, step)]
+    return []
+
+
+def iter_records(fmt, path):
+    """Serial record stream for any format (used for duplicate samples and JSON)."""
+    if fmt == "json":
+        yield from iter_json_array(path)
+    elif fmt == "ndjson":
+        yield from iter_ndjson(path)
+    elif fmt == "columnar":
+        with books_catalog.ColumnarCatalog(path) as catalog:
+            yield from catalog
+    else:
+        directory = path if os.path.isdir(path) else os.path.dirname(path)
+        with open(os.path.join(directory, books_catalog.ChunkWriter.MANIFEST), encoding="utf-8") as f:
+            chunks = json.load(f)["chunks"]
+        for chunk in chunks:
+            with open(os.path.join(directory, chunk["file"]), encoding="utf-8") as f:
+                yield from json.load(f)["books"]
+
+
+def validate(path, workers=1, currency="auto", max_samples=20, price_range=None):
+    """Validate one artifact and return the machine-readable report."""
+    start = time.perf_counter()
+    fmt = detect_format(path)
+    result = Checker(currency, max_samples, price_range)
+
+    if fmt == "json":
+        for i, book in enumerate(iter_json_array(path)):
+            result.check(i, book)
+    else:
+        jobs = plan(fmt, path, max(workers, 1), currency, price_range)
+        if workers > 1 and len(jobs) > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                parts = list(pool.map(_validate_segment, jobs))
+        else:
+            parts = [_validate_segment(job) for job in jobs]
+        for part in parts:
+            if fmt == "ndjson":
+                for sample in part.samples:
+                    sample["record"] += result.records
+            result.merge(part)
+
+    # Duplicates: sort the 8-byte pair hashes, then name a few offenders in a second pass
+    ordered = sorted(array("Q", bytes(result.digests)))
+    dup_hashes = {h for prev, h in zip(ordered, ordered[1:]) if h == prev}
+    duplicates = sum(1 for prev, h in zip(ordered, ordered[1:]) if h == prev)
+    del ordered
+    if duplicates:
+        result.errors["duplicate"] = duplicates
+        seen = set()
+        for i, book in enumerate(iter_records(fmt, path)):
+            if len(result.samples) >= max_samples:
+                break
+            if isinstance(book, dict) and int.from_bytes(pair_digest(book), sys.byteorder) in dup_hashes:
+                key = (book.get("isbn"), book.get("title"))
+                if key in seen:
+                    result.samples.append({"record": i, "check": "duplicate",
+                                           "message": f"duplicate ISBN+title {key}"})
+                seen.add(key)
+
+    return {
+        "path": path,
+        "format": fmt,
+        "records": result.records,
+        "valid": not result.errors,
+        "errors": result.errors,
+        "samples": result.samples,
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate ShelfSync catalog artifacts.")
+    parser.add_argument("paths", nargs="+", help="catalog files, chunk directories or manifests")
+    parser.add_argument("--workers", type=int, default=1, help="processes for chunked/NDJSON/columnar input")
+    parser.add_argument("--currency", choices=["auto", "usd", "inr"], default="auto",
+                        help="price range to enforce (auto: INR for normalized records)")
+    parser.add_argument("--price-range", type=parse_price_range, metavar="LOW-HIGH",
+                        help="accept prices in this range instead of the generated one (e.g. for merged listings)")
+    parser.add_argument("--max-samples", type=int, default=20, help="error samples kept per artifact")
+    parser.add_argument("--report", metavar="PATH", help="write the JSON report here ('-' for stdout)")
+    args = parser.parse_args(argv)
+
+    reports = [validate(path, args.workers, args.currency, args.max_samples, args.price_range) for path in args.paths]
+
+    if args.report == "-":
+        json.dump(reports, sys.stdout, indent=2)
+        print()
+    else:
+        for report in reports:
+            mark = "✓" if report["valid"] else "✗"
+            print(f"{mark} {report['path']} [{report['format']}] {report['records']} records "
+                  f"in {report['seconds']:.2f}s")
+            for check, count in sorted(report["errors"].items()):
+                print(f"    {check}: {count}")
+            for sample in report["samples"][:5]:
+                print(f"    #{sample['record']} {sample['check']}: {sample['message']}")
+        if args.report:
+            with open(args.report, "w", encoding="utf-8") as f:
+                json.dump(reports, f, indent=2)
+    return 0 if all(report["valid"] for report in reports) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())